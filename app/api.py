@@ -0,0 +1,164 @@
+'''API REST de scoring, sans interface, partageant les chargeurs du tableau de bord.
+
+Lancement (depuis la racine du dépôt) :
+
+    uvicorn api:app --app-dir app --workers 4
+
+Points d'entrée :
+    GET  /score/{sk_id_curr}    probabilité de défaut d'un client du portefeuille
+    POST /score                 probabilité de défaut d'un dossier (variables en JSON)
+    GET  /similar/{sk_id_curr}  dossiers les plus proches d'un client
+    GET  /explain/{sk_id_curr}  variables contribuant le plus au score d'un client
+    GET  /thresholds            métriques du portefeuille à un seuil de décision (core.thresholds)
+    GET  /metrics               métriques du processus au format Prometheus (core.metrics)
+
+Les calculs (chargements, recherches) tournent dans un pool de threads et les
+prédictions passent par la file de micro-batching : la boucle d'évènements n'est
+jamais bloquée.
+'''
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from core import explain, metrics, scoring, service, thresholds
+
+
+class Application(BaseModel):
+    '''Dossier à scorer : nom de variable -> valeur (variables absentes = manquantes)'''
+    features: Dict[str, Optional[float]]
+
+
+def warm_up():
+    '''Chargement des données, du modèle et des index avant la première requête'''
+    service.load_client_index()
+    service.load_model()
+    service.current_scores()
+    service.load_neighbors(service.load_dataset_version())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(warm_up)
+    yield
+
+
+app = FastAPI(title="API de scoring crédit", lifespan=lifespan)
+
+
+if metrics.ENABLED:
+    @app.middleware("http")
+    async def time_requests(request: Request, call_next):
+        start = metrics.clock()
+        response = await call_next(request)
+        #Chemin déclaré (/score/{sk_id_curr}) : un histogramme par point d'entrée, pas par client
+        route = request.scope.get("route")
+        name = f"api {request.method} {route.path if route else 'other'}"
+        metrics.histogram('dashboard_span_seconds', name).observe(metrics.clock() - start)
+        return response
+
+
+def describe(proba, band):
+    '''Probabilité, niveau de risque et décision (seuil de 10%)'''
+    _, message, _ = scoring.RISK_BANDS[band]
+    return {'probability': proba,
+            'risk_band': message,
+            'solvable': round(proba * 100) < scoring.DECISION_THRESHOLD}
+
+
+def _score_client(sk_id_curr):
+    scores = service.current_scores()
+    if sk_id_curr not in scores:
+        raise HTTPException(status_code=404, detail=f"Client {sk_id_curr} inconnu")
+    return {'sk_id_curr': sk_id_curr, **describe(*scores.lookup(sk_id_curr))}
+
+
+def _features_row(features):
+    names = service.feature_names()
+    positions = {name: i for i, name in enumerate(names)}
+    unknown = sorted(set(features) - set(positions))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Variables inconnues : {unknown}")
+    X = np.full((1, len(names)), np.nan)
+    for name, value in features.items():
+        if value is not None:
+            X[0, positions[name]] = value
+    return X
+
+
+def _similar(sk_id_curr, k):
+    neighbors = service.load_neighbors(service.load_dataset_version())
+    if sk_id_curr not in neighbors:
+        raise HTTPException(status_code=404, detail=f"Client {sk_id_curr} inconnu")
+    ids, distances = neighbors.query(sk_id_curr, k)
+    index_data, _ = service.load_client_index()
+    targets = index_data.records(ids)['TARGET']
+    return {'sk_id_curr': sk_id_curr,
+            'similar': [{'sk_id_curr': int(id), 'distance': float(distance),
+                         'target': int(targets[id]) if id in targets.index else None}
+                        for id, distance in zip(ids, distances)]}
+
+
+def _explain(sk_id_curr, k):
+    _, index_sample = service.load_client_index()
+    if sk_id_curr not in index_sample:
+        raise HTTPException(status_code=404, detail=f"Client {sk_id_curr} inconnu")
+    values = service.client_contributions(sk_id_curr)
+    names = service.feature_names()
+    return {'sk_id_curr': sk_id_curr,
+            'contributions': [{'feature': names[i], 'contribution': float(values[i])}
+                              for i in explain.top_contributions(values, k)]}
+
+
+@app.get("/score/{sk_id_curr}")
+async def score_client(sk_id_curr: int):
+    return await run_in_threadpool(_score_client, sk_id_curr)
+
+
+@app.post("/score")
+async def score_application(application: Application):
+    X = await run_in_threadpool(_features_row, application.features)
+    #Regroupé avec les autres demandes concurrentes en un seul predict_proba
+    proba = await asyncio.wrap_future(service.get_batcher().submit(X))
+    return describe(proba, int(scoring.risk_band(proba)))
+
+
+@app.get("/similar/{sk_id_curr}")
+async def similar(sk_id_curr: int, k: int = Query(10, ge=1, le=100)):
+    return await run_in_threadpool(_similar, sk_id_curr, k)
+
+
+@app.get("/explain/{sk_id_curr}")
+async def explain_client(sk_id_curr: int, k: int = Query(10, ge=1, le=100)):
+    return await run_in_threadpool(_explain, sk_id_curr, k)
+
+
+def _metrics_json(values):
+    return {name: None if np.isnan(value) else float(value) for name, value in values.items()}
+
+
+def _thresholds(threshold, segment):
+    if segment is not None and segment not in thresholds.SEGMENTS:
+        raise HTTPException(status_code=400, detail=f"Segment inconnu (valeurs possibles : {thresholds.SEGMENTS})")
+    key = service.current_key()
+    result = {'portfolio': _metrics_json(service.load_threshold_analysis(key).metrics(threshold))}
+    if segment is not None:
+        analyses = service.load_threshold_segments(key, segment)
+        result['segments'] = {str(label): _metrics_json(a.metrics(threshold)) for label, a in analyses.items()}
+    return result
+
+
+@app.get("/thresholds")
+async def threshold_metrics(threshold: float = Query(scoring.DECISION_THRESHOLD, ge=0, le=100),
+                            segment: Optional[str] = None):
+    return await run_in_threadpool(_thresholds, threshold, segment)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
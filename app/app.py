@@ -1,54 +1,45 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pickle
+#Bibliothèques graphiques (matplotlib, seaborn, plotly) importées à la première
+#utilisation : le premier rendu de la page n'en a pas besoin
+#import matplotlib.pyplot as plt
+#import seaborn as sns
 #import shap
-import plotly.express as px
-from zipfile import ZipFile
-from sklearn.cluster import KMeans
+#import plotly.express as px
 
+from core import cache, config, explain, figures, metrics, scoring, service, stats, thresholds, whatif
 
 
-plt.style.use('fivethirtyeight')
+
+#plt.style.use('fivethirtyeight')
 #sns.set()
-sns.set_theme(style="darkgrid")
+#sns.set_theme(style="darkgrid")
 #sns.set_style('darkgrid')
+#Style des graphiques : core.figures.use_style
 
 #st.set_page_config(page_title='Dashbord de Credit Scoring - Evilafo' ,layout="wide",page_icon='📊')
 
-def main() :
-
-    @st.cache
-    #@st.cache_resource
-    def load_data():
-        z = ZipFile("data/default_risk.zip")
-        data = pd.read_csv(z.open('default_risk.csv'), index_col='SK_ID_CURR', encoding ='utf-8')
-
-        z = ZipFile("data/X_sample.zip")
-        sample = pd.read_csv(z.open('X_sample.csv'), index_col='SK_ID_CURR', encoding ='utf-8')
-        
-        description = pd.read_csv("data/features_description.csv", 
-                                  usecols=['Row', 'Description'], index_col=0, encoding= 'unicode_escape')
-
-        target = data.iloc[:, -1:]
-
-        return data, sample, target, description
-
+def main(variant=None) :
 
-    def load_model():
-        '''chargement du modèle entrainé'''
-        pickle_in = open('model/LGBMClassifier.pkl', 'rb') 
-        clf = pickle.load(pickle_in)
-        return clf
+    #Instrumentation (core.metrics, DASHBOARD_METRICS=1) : sans effet si désactivée
+    rerun_start = metrics.clock()
+    if metrics.ENABLED and config.METRICS_PORT:
+        metrics.start_http_server(config.METRICS_PORT)
 
+    #Variante affichée : ?variant=... dans l'URL, sinon celle de l'appelant, sinon
+    #DASHBOARD_VARIANT. Les deux variantes partagent les mêmes caches du processus.
+    variant = st.query_params.get("variant") or variant or config.VARIANT
+    if variant not in config.VARIANTS:
+        variant = config.VARIANT
+    show_decision = variant == "decision"
 
-    @st.cache(allow_output_mutation=True)
-    #@st.cache_resource
-    def load_knn(sample):
-        knn = knn_training(sample)
-        return knn
+    #Chargeurs partagés avec l'API (core.service) : caches à clés explicites (version
+    #des données, id client), les DataFrames ne sont jamais hachés.
+    load_data = service.load_data
+    load_client_index = service.load_client_index
+    load_dataset_version = service.load_dataset_version
+    load_neighbors = service.load_neighbors
 
     def calculate_feature_importance(X, model):
         importances = model.feature_importances_
@@ -56,68 +47,130 @@ def main() :
         return pd.Series(importances, index=feature_names)
 
 
-    @st.cache
-    #@st.cache_resource
-    def load_infos_gen(data):
-        lst_infos = [data.shape[0],
-                     round(data["AMT_INCOME_TOTAL"].mean(), 2),
-                     round(data["AMT_CREDIT"].mean(), 2)]
+    @cache.memoize('population_stats', key=lambda version, data: version, maxsize=2)
+    def load_population_stats(version, data):
+        '''Agrégats et histogrammes du portefeuille, calculés une fois par version des données'''
+        return stats.load_population_stats(data, version)
 
-        nb_credits = lst_infos[0]
-        rev_moy = lst_infos[1]
-        credits_moy = lst_infos[2]
 
-        targets = data.TARGET.value_counts()
+    def load_infos_gen(population):
+        nb_credits = population.nb_credits
+        rev_moy = population.rev_moy
+        credits_moy = population.credits_moy
+
+        targets = population.targets
 
         return nb_credits, rev_moy, credits_moy, targets
 
 
-    def identite_client(data, id):
-        data_client = data[data.index == int(id)]
+    def identite_client(index, id):
+        data_client = index.record(id)
         return data_client
 
-    @st.cache
-    #@st.cache_resource
-    def load_age_population(data):
-        data_age = round((data["DAYS_BIRTH"]/365), 2)
-        return data_age
-
-    @st.cache
-    #@st.cache_resource
-    def load_income_population(sample):
-        df_income = pd.DataFrame(sample["AMT_INCOME_TOTAL"])
-        df_income = df_income.loc[df_income['AMT_INCOME_TOTAL'] < 200000, :]
-        return df_income
-
-    @st.cache
-    #@st.cache_resource
-    def load_prediction(sample, id, clf):
-        X=sample.iloc[:, :-1]
-        score = clf.predict_proba(X[X.index == int(id)])[:,1]
-        return score
-
-    @st.cache
-    #@st.cache_resource
-    def load_kmeans(sample, id, mdl):
-        index = sample[sample.index == int(id)].index.values
-        index = index[0]
-        data_client = pd.DataFrame(sample.loc[sample.index, :])
-        df_neighbors = pd.DataFrame(knn.fit_predict(data_client), index=data_client.index)
-        df_neighbors = pd.concat([df_neighbors, data], axis=1)
-        return df_neighbors.iloc[:,1:].sample(10)
-
-    @st.cache
-    #@st.cache_resource
-    def knn_training(sample):
-        knn = KMeans(n_clusters=2).fit(sample)
-        return knn 
+    def load_age_population(population):
+        '''(bornes, effectifs) de l'histogramme des âges'''
+        return population.age_hist
+
+    def load_income_population(population):
+        '''(bornes, effectifs) de l'histogramme des revenus (< 200 000)'''
+        return population.income_hist
+
+    #Graphiques de population : dessinés une fois par version des données (core.figures),
+    #seul le marqueur du client est redessiné
+    @cache.memoize('pie_figure', key=lambda version, population: version, maxsize=2)
+    def load_pie_figure(version, population):
+        #Relu depuis le stockage s'il a déjà été rendu pour cette version
+        def render():
+            fig, ax = figures.new_figure(figsize=(5,5))
+            ax.pie(population.targets, explode=[0, 0.1], labels=['Solvable', 'Non solvable'], autopct='%1.1f%%', startangle=90)
+            return figures.render_png(fig)
+        return figures.stored_png('pie', version, render)
+
+    @cache.memoize('age_figure', key=lambda version, population: version, maxsize=2)
+    def load_age_figure(version, population):
+        import seaborn as sns
+        age_edges, age_counts = load_age_population(population)
+        def draw(ax):
+            sns.histplot(x=age_edges[:-1], weights=age_counts, bins=age_edges.tolist(), edgecolor = 'k', color="skyblue", ax=ax)
+            ax.set(title='Age du client', xlabel='Age(Années)', ylabel='')
+        return figures.MarkerFigure(draw, figsize=(10, 5), color="red", linestyle='--')
+
+    @cache.memoize('income_figure', key=lambda version, population: version, maxsize=2)
+    def load_income_figure(version, population):
+        import seaborn as sns
+        income_edges, income_counts = load_income_population(population)
+        def draw(ax):
+            sns.histplot(x=income_edges[:-1], weights=income_counts, bins=income_edges.tolist(), edgecolor = 'k', color="goldenrod", ax=ax)
+            ax.set(title='Revenu du client', xlabel='Revenu (USD)', ylabel='')
+        return figures.MarkerFigure(draw, figsize=(10, 5), color="green", linestyle='--')
+
+    @cache.memoize('scatter_points', key=lambda version, data, budget: (version, budget), maxsize=2)
+    def load_scatter_points(version, data, budget):
+        '''Échantillon stratifié (CODE_GENDER) du portefeuille pour le nuage Âge / Revenu'''
+        return stats.scatter_points(data, budget)
+
+    @cache.memoize('scatter_figure', key=lambda version, data, id: (version, int(id)),
+                   maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+    def load_scatter_figure(version, data, id):
+        '''Nuage Âge / Revenu Total du portefeuille, client sélectionné inclus'''
+        #Nombre de points borné (config.SCATTER_POINT_BUDGET), client sélectionné toujours inclus
+        import plotly.express as px
+        infos_client = identite_client(index_data, id)
+        data_sk = stats.with_client(load_scatter_points(version, data, config.SCATTER_POINT_BUDGET), infos_client)
+        fig = px.scatter(data_sk, x='DAYS_BIRTH', y="AMT_INCOME_TOTAL", 
+                         size="AMT_INCOME_TOTAL", color='CODE_GENDER',
+                         hover_data=['NAME_FAMILY_STATUS', 'CNT_CHILDREN', 'NAME_CONTRACT_TYPE', 'SK_ID_CURR'])
+
+        fig.update_layout({'plot_bgcolor':'#f0f0f0'}, 
+                          title={'text':"Relation Âge / Revenu Total", 'x':0.5, 'xanchor': 'center'}, 
+                          title_font=dict(size=20, family='Verdana'), legend=dict(y=1.1, orientation='h'))
+
+
+        fig.update_traces(marker=dict(line=dict(width=0.5, color='#3a352a')), selector=dict(mode='markers'))
+        fig.update_xaxes(showline=True, linewidth=2, linecolor='#f0f0f0', gridcolor='#cbcbcb',
+                         title="Age", title_font=dict(size=18, family='Verdana'))
+        fig.update_yaxes(showline=True, linewidth=2, linecolor='#f0f0f0', gridcolor='#cbcbcb',
+                         title="Revenu Total", title_font=dict(size=18, family='Verdana'))
+
+        return fig
+
+    @cache.memoize('contributions', key=lambda key, index, description, id, k=10: (key, int(id), k),
+                   maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+    def load_contributions(key, index, description, id, k=10):
+        '''k variables de plus forte contribution au score du client (précalculées, sinon à la demande)'''
+        values = service.client_contributions(id)
+        top = explain.top_contributions(values, k)
+        names = np.array(service.feature_names())[top]
+        descriptions = description['Description'][~description.index.duplicated()]
+        return pd.DataFrame({'Variable': names,
+                             'Valeur du client': index.row(id)[top],
+                             'Contribution': values[top],
+                             'Description': descriptions.reindex(names).fillna('').values})
+
+    def load_prediction(scores, id):
+        '''Probabilité de défaut et niveau de risque lus dans la table des scores'''
+        score, band = scores.lookup(id)
+        return score, band
+
+    @cache.memoize('similar', key=lambda neighbors, index, id, k=10: (neighbors.key, int(id), k),
+                   maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+    def load_similar(neighbors, index, id, k=10):
+        '''Dossiers des k clients les plus proches, du plus proche au plus éloigné'''
+        ids, _ = neighbors.query(id, k)
+        return index.records(ids)
 
 
 
     #Loading data……
-    data, sample, target, description = load_data()
-    id_client = sample.index.values
-    clf = load_model()
+    with metrics.span("load_data"):
+        data, sample, target, description = load_data()
+    with metrics.span("load_client_index"):
+        index_data, index_sample = load_client_index()
+    version = load_dataset_version()
+    #Le modèle n'est chargé que si la table des scores doit être recalculée
+    #clf = load_model()
+    with metrics.span("load_scores"):
+        scores = service.current_scores()
 
 
     #######################################
@@ -160,10 +213,29 @@ def main() :
     st.sidebar.header("**Informations Generales**")
 
     #Loading selectbox
-    chk_id = st.sidebar.selectbox("Rechercher l'ID du Client", id_client)
+    #chk_id = st.sidebar.selectbox("Rechercher l'ID du Client", id_client)
+    #Recherche côté serveur : seuls les config.SEARCH_LIMIT premiers identifiants correspondants
+    #sont envoyés au navigateur. Lien direct vers un client : ?client=<SK_ID_CURR>
+    deep_link = st.query_params.get("client")
+    if "client_query" not in st.session_state:
+        st.session_state.client_query = deep_link or ""
+    query = st.sidebar.text_input("Rechercher l'ID du Client", key="client_query",
+                                  help="Début de l'identifiant (ex. 1002) ou intervalle (ex. 100002-100500)")
+    with metrics.span("client_search"):
+        id_client = index_sample.search(query, config.SEARCH_LIMIT)
+    if not len(id_client):
+        st.sidebar.warning("Aucun client ne correspond à la recherche")
+        id_client = index_sample.search("", config.SEARCH_LIMIT)
+    id_client = id_client.tolist()
+    selected = int(deep_link) if deep_link and deep_link.isdigit() and int(deep_link) in id_client else id_client[0]
+    chk_id = st.sidebar.selectbox("Client", id_client,
+                                  index=id_client.index(selected))
+    st.query_params["client"] = str(chk_id)
 
     #Loading general info
-    nb_credits, rev_moy, credits_moy, targets = load_infos_gen(data)
+    with metrics.span("population_stats"):
+        population = load_population_stats(version, data)
+    nb_credits, rev_moy, credits_moy, targets = load_infos_gen(population)
 
 
     ### Display of information in the sidebar ###
@@ -181,9 +253,15 @@ def main() :
     
     #PieChart
     #st.sidebar.markdown("<u>......</u>", unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(5,5))
-    plt.pie(targets, explode=[0, 0.1], labels=['Solvable', 'Non solvable'], autopct='%1.1f%%', startangle=90)
-    st.sidebar.pyplot(fig)
+    #fig, ax = plt.subplots(figsize=(5,5))
+    #plt.pie(targets, explode=[0, 0.1], labels=['Solvable', 'Non solvable'], autopct='%1.1f%%', startangle=90)
+    #st.sidebar.pyplot(fig)
+    with metrics.span("pie_figure"):
+        st.sidebar.image(load_pie_figure(version, population))
+
+    #Panneau de debug : ?debug=1 dans l'URL ou DASHBOARD_DEBUG=1 (rempli en fin de rerun)
+    debug = config.DEBUG or st.query_params.get("debug") == "1"
+    debug_panel = st.sidebar.container() if debug else None
 
     #Copyright
     with st.sidebar:
@@ -209,11 +287,10 @@ def main() :
     # PAGE D'ACCUEIL - CONTENU PRINCIPAL
     #######################################
 
-    st.success(
-        """
-        L'objectif de cette application est d'évaluer le risque de défaut de paiement d'un emprunteur potentiel en utilisant des données démographiques et financières. Le seuil est de 10%.
-        """,
-    )
+    objectif = "L'objectif de cette application est d'évaluer le risque de défaut de paiement d'un emprunteur potentiel en utilisant des données démographiques et financières."
+    if show_decision:
+        objectif += f" Le seuil est de {scoring.DECISION_THRESHOLD}%."
+    st.success(objectif)
     
     #ID du client Sidebar
     st.write("Numéro du client sélectionné:", chk_id)
@@ -223,35 +300,32 @@ def main() :
 
     #Affichage de la solvabilité du client
     st.header("**Analyse du dossier client**")
-    prediction = load_prediction(sample, chk_id, clf)
+    with metrics.span("prediction"):
+        prediction, band = load_prediction(scores, chk_id)
     #Calcul probabilite
-    predict = round(float(prediction)*100)
-    decisionsolvable = "(Solvable)"
-    decisionnonsolvable = "(Non solvable)"
-
-    if predict < 1 :
-        message = "Très faible"
-        couleur = "green "
-        st.markdown(f""" Probabilité de risque de défaut : <b> :green[{predict}%] {message} :green[{decisionsolvable}] </b> """, unsafe_allow_html=True)
-    elif predict < 5 :
-        message = "Faible"
-        couleur = "green "
-        st.markdown(f""" Probabilité de risque de défaut : <b> :green[{predict}%] {message} :green[{decisionsolvable}] </b> """, unsafe_allow_html=True)
-    elif predict < 10 :
-        message = "Moyen"
-        couleur = "Blue "
-        st.markdown(f""" Probabilité de risque de défaut : <b> :blue[{predict}%] {message} :green[{decisionsolvable}] </b> """, unsafe_allow_html=True)
-    elif predict < 20 :
-        message = "Elevé"
-        couleur = "orange "
-        st.markdown(f""" Probabilité de risque de défaut : <b> :orange[{predict}%] {message} :red[{decisionnonsolvable}] </b> """, unsafe_allow_html=True)
-    elif predict >= 20 :
-        message = "Très élevé"
-        couleur = "rouge"
-        st.markdown(f""" Probabilité de risque de défaut : <b> :red[{predict}%] {message} :red[{decisionnonsolvable}] </b> """, unsafe_allow_html=True)   
+    predict = round(prediction*100)
+    _, message, couleur = scoring.RISK_BANDS[band]
+    if not show_decision :
+        decision = ""
+    elif predict < scoring.DECISION_THRESHOLD :
+        decision = " :green[(Solvable)]"
+    else :
+        decision = " :red[(Non solvable)]"
+    st.markdown(f""" Probabilité de risque de défaut : <b> :{couleur}[{predict}%] {message}{decision} </b> """, unsafe_allow_html=True)
+
+    #Segment du client : segmentation entraînée hors ligne (python app/prepare_data.py segment),
+    #seulement lue ici
+    with metrics.span("segments"):
+        segments = service.load_segments(version)
+        profile = service.load_segment_profile(version) if segments is not None else None
+    if segments is not None and chk_id in segments:
+        segment = segments.lookup(chk_id)
+        st.markdown(f"Segment du client : <b>{segment + 1}</b> sur {len(segments.centroids)} "
+                    f"({profile['part'][segment]:.0%} du portefeuille, "
+                    f"taux de défaut observé {profile['taux de défaut'][segment]:.1%})", unsafe_allow_html=True)
 
     st.markdown("<u>Données du client:</u>", unsafe_allow_html=True)
-    idcli = identite_client(data, chk_id)
+    idcli = identite_client(index_data, chk_id)
     idcli2 = idcli.copy()
     idcli2.drop('TARGET', axis=1, inplace=True)
     idcli2.insert(0, 'TARGET', idcli['TARGET'])
@@ -263,27 +337,29 @@ def main() :
     #Informations du client : Genre, Age, Statut familial, Enfants...
     st.header("**Informations du client**")
     
-    with st.expander("Afficher les informations du client ?"):
-    #if st.checkbox("Afficher les informations du client ?"):
-
-        infos_client = identite_client(data, chk_id)
+    #Sections détaillées : calculées seulement une fois ouvertes (case à cocher), et
+    #réexécutées seules (fragment) à l'ouverture ou à la fermeture
+    @st.fragment
+    def section_infos_client(chk_id):
+        #with st.expander("Afficher les informations du client ?"):
+        if not st.checkbox("Afficher les informations du client ?"):
+            return
+
+        infos_client = identite_client(index_data, chk_id)
         code_genre = infos_client["CODE_GENDER"].values[0]
         st.markdown(f"""**Genre : ** {code_genre} """)
         #st.write.markdown(f"""**Genre : ** {code_genre} """)
         #st.write("**Genre : **", infos_client["CODE_GENDER"].values[0])
-        st.write("**Age : **{:.0f} ans".format(int(infos_client["DAYS_BIRTH"]/365)))
+        st.write("**Age : **{:.0f} ans".format(int(infos_client["DAYS_BIRTH"].values[0]/365)))
         st.write("**Statut familial : **", infos_client["NAME_FAMILY_STATUS"].values[0])
         st.write("**Nombre d'enfant : **{:.0f}".format(infos_client["CNT_CHILDREN"].values[0]))
 
         #Age distribution plot
-        data_age = load_age_population(data)
-        fig, ax = plt.subplots(figsize=(10, 5))
+        #Histogramme tracé à partir des effectifs précalculés
         #sns.histplot(data_age, edgecolor = 'k', color="goldenrod", bins=20)
         #ax.axvline(int(infos_client["DAYS_BIRTH"].values / 365), color="green", linestyle='--')
-        sns.histplot(data_age, edgecolor = 'k', color="skyblue", bins=20)
-        ax.axvline(int(infos_client["DAYS_BIRTH"].values / 365), color="red", linestyle='--')
-        ax.set(title='Age du client', xlabel='Age(Années)', ylabel='')
-        st.pyplot(fig)
+        with metrics.span("age_figure"):
+            st.image(load_age_figure(version, population).render(int(infos_client["DAYS_BIRTH"].values[0] / 365)))
     
         
         st.subheader("*Revenu (USD)*")
@@ -294,35 +370,13 @@ def main() :
         st.write("**Montant du bien pour pour lequel le prêt est accordé : **{:.0f}".format(infos_client["AMT_GOODS_PRICE"].values[0])) 
         
         #Diagramme de répartition des revenus
-        data_income = load_income_population(data)
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.histplot(data_income["AMT_INCOME_TOTAL"], edgecolor = 'k', color="goldenrod", bins=10)
-        ax.axvline(int(infos_client["AMT_INCOME_TOTAL"].values[0]), color="green", linestyle='--')
-        ax.set(title='Revenu du client', xlabel='Revenu (USD)', ylabel='')
-        st.pyplot(fig)
+        with metrics.span("income_figure"):
+            st.image(load_income_figure(version, population).render(int(infos_client["AMT_INCOME_TOTAL"].values[0])))
         
-        #Relation Âge / Revenu Total graphique interactif
-        data_sk = data.reset_index(drop=False)
-        data_sk.DAYS_BIRTH = (data_sk['DAYS_BIRTH']/365).round(1)
-        fig, ax = plt.subplots(figsize=(10, 5))
-        fig = px.scatter(data_sk, x='DAYS_BIRTH', y="AMT_INCOME_TOTAL", 
-                         size="AMT_INCOME_TOTAL", color='CODE_GENDER',
-                         hover_data=['NAME_FAMILY_STATUS', 'CNT_CHILDREN', 'NAME_CONTRACT_TYPE', 'SK_ID_CURR'])
-
-        fig.update_layout({'plot_bgcolor':'#f0f0f0'}, 
-                          title={'text':"Relation Âge / Revenu Total", 'x':0.5, 'xanchor': 'center'}, 
-                          title_font=dict(size=20, family='Verdana'), legend=dict(y=1.1, orientation='h'))
-
-
-        fig.update_traces(marker=dict(line=dict(width=0.5, color='#3a352a')), selector=dict(mode='markers'))
-        fig.update_xaxes(showline=True, linewidth=2, linecolor='#f0f0f0', gridcolor='#cbcbcb',
-                         title="Age", title_font=dict(size=18, family='Verdana'))
-        fig.update_yaxes(showline=True, linewidth=2, linecolor='#f0f0f0', gridcolor='#cbcbcb',
-                         title="Revenu Total", title_font=dict(size=18, family='Verdana'))
-
-        st.plotly_chart(fig)
-
-
+        #Relation Âge / Revenu Total graphique interactif (figure mise en cache par client)
+        #Mesure le calcul de la figure et sa sérialisation Plotly
+        with metrics.span("scatter_chart"):
+            st.plotly_chart(load_scatter_figure(version, data, chk_id))
         #Relation Âge / Revenu Total graphique interactif
         #data_sk = data.reset_index(drop=False)
         #data_sk.DAYS_BIRTH = (data_sk['DAYS_BIRTH']/365).round(1)    
@@ -347,25 +401,135 @@ def main() :
     
     #Feature importance / description \\ supprimé
 
-    #Similar customer files display
-    #chk_voisins = st.checkbox("Afficher les dossiers similaires ?")
-    with st.expander("Afficher les dossiers similaires ?") :
-    #if chk_voisins:
-        #knn = load_knn(sample)
-        #st.markdown("<u>Liste des 10 dossiers les plus proches de ce Client :</u>", unsafe_allow_html=True)
-        #st.dataframe(load_kmeans(sample, chk_id, knn))
-        #st.markdown("<i>Target 1 = Client non solvables</i>", unsafe_allow_html=True)
+    with metrics.span("section_infos_client"):
+        section_infos_client(chk_id)
+
+    #Facteurs de la prédiction : contributions des variables au score du client
+    @st.fragment
+    def section_facteurs(chk_id):
+        if not st.checkbox("Afficher les facteurs de la prédiction ?"):
+            return
+        import plotly.express as px
+        with metrics.span("contributions"):
+            contributions = load_contributions(service.current_key(), index_sample, description, chk_id)
+        st.markdown("<u>Variables ayant le plus influencé le score de ce client :</u>", unsafe_allow_html=True)
+        fig = px.bar(contributions.iloc[::-1], x='Contribution', y='Variable', orientation='h',
+                     color=np.where(contributions['Contribution'].iloc[::-1] > 0, 'Augmente le risque', 'Diminue le risque'),
+                     color_discrete_map={'Augmente le risque': 'red', 'Diminue le risque': 'green'},
+                     hover_data=['Valeur du client', 'Description'])
+        fig.update_layout({'plot_bgcolor':'#f0f0f0'}, legend=dict(title='', y=1.1, orientation='h'))
+        with metrics.span("contributions_chart"):
+            st.plotly_chart(fig)
+        st.dataframe(contributions, hide_index=True)
+        st.markdown("<i>Contributions en log-odds (valeurs SHAP du modèle)</i>", unsafe_allow_html=True)
+
+    with metrics.span("section_facteurs"):
+        section_facteurs(chk_id)
+
+    #Simulation what-if : probabilité de défaut du client sur une grille de valeurs de
+    #deux variables, scorée en un seul appel au modèle (grille en cache par client et couple)
+    @st.fragment
+    def section_simulation(chk_id):
+        if not st.checkbox("Simuler d'autres valeurs (what-if) ?"):
+            return
+        import plotly.graph_objects as go
+        features = service.feature_names()
+        defaults = [f for f in whatif.DEFAULT_FEATURES if f in features] + features[:2]
+        col1, col2 = st.columns(2)
+        x_feature = col1.selectbox("Variable en abscisse", features, index=features.index(defaults[0]))
+        y_options = [f for f in features if f != x_feature]
+        #Variable choisie en abscisse parmi les valeurs par défaut : première autre variable
+        y_default = next((f for f in defaults[1:] if f != x_feature), y_options[0])
+        y_feature = col2.selectbox("Variable en ordonnée", y_options, index=y_options.index(y_default))
+
+        with metrics.span("whatif"):
+            grid = service.whatif_grid(chk_id, x_feature, y_feature)
+        proba = grid.proba * 100
+        fig = go.Figure(go.Heatmap(x=grid.x, y=grid.y, z=proba, colorscale='RdYlGn_r', zmin=0,
+                                   colorbar=dict(title='Risque (%)'),
+                                   hovertemplate=f"{x_feature} : %{{x:.4g}}<br>{y_feature} : %{{y:.4g}}"
+                                                 "<br>Risque : %{z:.1f}%<extra></extra>"))
+        if len(grid.x) > 1 and len(grid.y) > 1:
+            #Courbe du seuil de décision : au-delà, le client serait jugé non solvable
+            fig.add_trace(go.Contour(x=grid.x, y=grid.y, z=proba, showscale=False, hoverinfo='skip',
+                                     contours=dict(start=scoring.DECISION_THRESHOLD, end=scoring.DECISION_THRESHOLD,
+                                                   size=1, coloring='lines', showlabels=True),
+                                     line=dict(color='black', width=2, dash='dash'),
+                                     name=f"Seuil {scoring.DECISION_THRESHOLD}%"))
+        if not np.isnan(grid.client).any():
+            fig.add_trace(go.Scatter(x=[grid.client[0]], y=[grid.client[1]], mode='markers', name='Client',
+                                     marker=dict(symbol='x', size=14, color='black')))
+        fig.update_layout({'plot_bgcolor':'#f0f0f0'}, xaxis_title=x_feature, yaxis_title=y_feature,
+                          legend=dict(y=1.1, orientation='h'))
+        st.plotly_chart(fig)
+        st.markdown(f"<i>Probabilité de défaut simulée de {proba.min():.0f}% à {proba.max():.0f}% ; "
+                    f"courbe en pointillés : seuil de {scoring.DECISION_THRESHOLD}%</i>", unsafe_allow_html=True)
 
+    with metrics.span("section_simulation"):
+        section_simulation(chk_id)
 
-        knn = load_knn(sample)
+    #Similar customer files display
+    @st.fragment
+    def section_dossiers_similaires(chk_id):
+        #with st.expander("Afficher les dossiers similaires ?") :
+        if not st.checkbox("Afficher les dossiers similaires ?"):
+            return
+        with metrics.span("similar_clients"):
+            neighbors = load_neighbors(version)
+            dossier_proche1 = load_similar(neighbors, index_data, chk_id)
         st.markdown("<u>Liste des 10 dossiers les plus proches de ce Client :</u>", unsafe_allow_html=True)
-        dossier_proche1 = load_kmeans(sample, chk_id, knn)
         dossier_proche2 = dossier_proche1.copy()
         dossier_proche2.drop('TARGET', axis=1, inplace=True)
         dossier_proche2.insert(0, 'TARGET', dossier_proche1['TARGET'])
         st.dataframe(dossier_proche2)
         st.markdown("<i>Target 1 = Clients non solvables</i>", unsafe_allow_html=True)
 
+    with metrics.span("section_dossiers_similaires"):
+        section_dossiers_similaires(chk_id)
+
+    #Analyse du seuil de décision sur tout le portefeuille : scores triés une fois,
+    #chaque position du curseur n'est qu'une recherche dichotomique
+    @st.fragment
+    def section_seuil():
+        if not st.checkbox("Analyser le seuil de décision (portefeuille) ?"):
+            return
+        import plotly.graph_objects as go
+        key = service.current_key()
+        with metrics.span("threshold_analysis"):
+            analysis = service.load_threshold_analysis(key)
+        seuil = st.slider("Seuil de décision (%)", min_value=1.0, max_value=50.0,
+                          value=float(scoring.DECISION_THRESHOLD), step=0.5)
+        m = analysis.metrics(seuil)
+        col1, col2, col3, col4 = st.columns(4)
+        acceptation = m["taux d'acceptation"]
+        col1.metric("Taux d'acceptation", f"{acceptation:.1%}")
+        #Aucun dossier accepté (ou aucun défaut observé) : taux non défini, comme None dans l'API
+        defaut = m['taux de défaut observé']
+        ecartes = m['défauts écartés']
+        col2.metric("Défaut observé (acceptés)", "–" if m['acceptés'] == 0 else f"{defaut:.2%}")
+        col3.metric("Perte attendue (USD)", f"{m['perte attendue']:,.0f}")
+        col4.metric("Défauts écartés", "–" if np.isnan(ecartes) else f"{ecartes:.1%}")
+
+        curves = analysis.curves(np.arange(1, 50.5, 0.5))
+        fig = go.Figure()
+        for name in ["taux d'acceptation", 'taux de défaut observé', 'taux de défaut attendu',
+                     'taux de perte attendu', 'défauts écartés']:
+            fig.add_trace(go.Scatter(x=curves['seuil (%)'], y=curves[name] * 100, mode='lines', name=name))
+        fig.add_vline(x=seuil, line_dash='dash', line_color='black')
+        fig.update_layout({'plot_bgcolor':'#f0f0f0'}, xaxis_title="Seuil (%)", yaxis_title="%",
+                          legend=dict(y=1.15, orientation='h'))
+        st.plotly_chart(fig)
+
+        segment = st.selectbox("Détail par segment", ["Aucun"] + thresholds.SEGMENTS)
+        if segment != "Aucun":
+            st.dataframe(thresholds.segment_metrics(service.load_threshold_segments(key, segment), seuil),
+                         hide_index=True)
+        st.markdown(f"<i>Un dossier est accepté si sa probabilité de défaut (arrondie) est inférieure au seuil ; "
+                    f"{len(analysis)} dossiers scorés. Pertes pondérées par AMT_CREDIT.</i>", unsafe_allow_html=True)
+
+    with metrics.span("section_seuil"):
+        section_seuil()
+
     
 
 
@@ -382,6 +546,21 @@ def main() :
             """
     st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
+    metrics.observe_rerun(rerun_start, st.session_state)
+    if debug_panel is not None:
+        with debug_panel.expander("Debug : caches et performances"):
+            st.dataframe(pd.DataFrame(cache.all_stats()), hide_index=True)
+            if not metrics.ENABLED:
+                st.caption("Mesure des durées désactivée (DASHBOARD_METRICS=1)")
+            else:
+                reruns = metrics.session_reruns(st.session_state)
+                if reruns is not None:
+                    st.markdown("Reruns de cette session")
+                    st.dataframe(pd.DataFrame([reruns.summary()]), hide_index=True)
+                st.markdown("Sections (processus)")
+                st.dataframe(pd.DataFrame(metrics.span_summaries()), hide_index=True)
+                st.caption(f"Mémoire résidente : {metrics.resident_memory() / 2**20:.0f} Mo")
+
 
 
 
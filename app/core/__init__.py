@@ -0,0 +1 @@
+'''Coeur partagé du tableau de bord de scoring crédit (accès aux données, scoring...).'''
@@ -0,0 +1,79 @@
+'''Regroupement (micro-batching) des demandes de scoring concurrentes.
+
+Un appel à ``predict_proba`` a un coût fixe qui domine le scoring d'une seule
+ligne. Les demandes d'une ligne arrivant en même temps sont collectées pendant
+quelques millisecondes (au plus ``max_batch_size`` lignes ou ``max_wait_ms``)
+puis scorées en un seul appel vectorisé ; chaque appelant reçoit son résultat.
+'''
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    '''File de scoring : ``predict`` reçoit une matrice et renvoie une probabilité par ligne'''
+
+    def __init__(self, predict, max_batch_size=64, max_wait_ms=2.0):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, x):
+        '''Demande de scoring d'une ligne ; renvoie un Future (probabilité)'''
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self._queue.put((np.asarray(x, dtype=np.float64).ravel(), future))
+        return future
+
+    def predict_one(self, x, timeout=None):
+        '''Scoring bloquant d'une ligne, regroupé avec les demandes concurrentes'''
+        return self.submit(x).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            #Les demandes annulées entre-temps sont ignorées
+            batch = [(x, future) for x, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                proba = self.predict(np.vstack([x for x, _ in batch]))
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), p in zip(batch, proba):
+                future.set_result(float(p))
+
+    def stats(self):
+        return {'lots': self.batches, 'lignes': self.rows,
+                'taille moyenne': self.rows / self.batches if self.batches else 0.0}
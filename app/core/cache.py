@@ -0,0 +1,131 @@
+'''Caches mémoire à clés explicites.
+
+Remplace ``@st.cache``, qui hachait le contenu complet des DataFrames passés en
+argument à chaque appel. Ici la clé est calculée à partir d'identifiants peu
+coûteux (version du jeu de données, identifiant client...). Chaque cache est
+borné (éviction LRU, durée de vie optionnelle), partagé par toutes les sessions
+du processus, et compte ses succès et échecs pour le panneau de debug.
+
+Les valeurs sont renvoyées sans copie : elles ne doivent pas être modifiées.
+'''
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+#nom -> KeyedCache, pour que les fonctions redéfinies à chaque exécution du script
+#retrouvent le même cache
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class KeyedCache:
+    '''Cache LRU borné, avec durée de vie optionnelle (en secondes)'''
+
+    def __init__(self, name, maxsize=128, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires = entry
+        if expires is not None and expires < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, func):
+        '''Valeur en cache pour key, sinon func() (calculée une seule fois par clé)'''
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            key_lock = self._pending.setdefault(key, threading.Lock())
+
+        #Un seul calcul par clé : les appels concurrents attendent le premier
+        with key_lock:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    self.hits += 1
+                    return value
+                self.misses += 1
+            try:
+                value = func()
+                with self._lock:
+                    self._store(key, value)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'cache': self.name, 'entrées': len(self._entries), 'taille max': self.maxsize,
+                'ttl (s)': self.ttl, 'succès': self.hits, 'échecs': self.misses,
+                'évictions': self.evictions}
+
+
+def get_cache(name, maxsize=128, ttl=None):
+    '''Cache nommé du processus (créé au premier appel)'''
+    with _CACHES_LOCK:
+        if name not in _CACHES:
+            _CACHES[name] = KeyedCache(name, maxsize, ttl)
+        return _CACHES[name]
+
+
+def memoize(name, key=None, maxsize=128, ttl=None):
+    '''Décorateur : résultat mis en cache sous key(*args, **kwargs).
+
+    Sans fonction de clé, les arguments eux-mêmes servent de clé : ils doivent
+    être hachables et peu coûteux (identifiants, versions), jamais des DataFrames.
+    '''
+    cache = get_cache(name, maxsize, ttl)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return cache.get_or_compute(k, lambda: func(*args, **kwargs))
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def all_caches():
+    with _CACHES_LOCK:
+        return list(_CACHES.values())
+
+
+def all_stats():
+    '''Compteurs de tous les caches du processus'''
+    return [c.stats() for c in all_caches()]
@@ -0,0 +1,143 @@
+'''Index des dossiers clients par SK_ID_CURR.
+
+Remplace les sélections par masque booléen (``data[data.index == int(id)]``), qui
+parcourent tout le DataFrame, par une recherche dichotomique dans les
+identifiants triés (``IdPositions``) : O(log n), quelques microsecondes.
+Les deux tableaux NumPy utilisés (identifiants triés, permutation de tri) coûtent
+16 octets par client, contre plus de 100 pour un dict Python, et peuvent être
+partagés entre processus (voir core.shared). Les tables indexées par les mêmes
+identifiants (scores, contributions, dossiers similaires, segments) réutilisent
+ceux de l'index au lieu de construire les leurs.
+La recherche par début d'identifiant ou par intervalle se fait sur les mêmes
+identifiants triés.
+'''
+import numpy as np
+
+
+class IdPositions:
+    '''Position de chaque identifiant dans un tableau d'identifiants, par dichotomie'''
+
+    def __init__(self, ids, sorted_ids=None, order=None):
+        self.order = np.argsort(ids, kind='stable') if order is None else order
+        self.sorted_ids = np.asarray(ids)[self.order] if sorted_ids is None else sorted_ids
+
+    def __len__(self):
+        return len(self.order)
+
+    def get(self, id, default=None):
+        '''Position d'un identifiant, ou default s'il est inconnu'''
+        i = int(self.sorted_ids.searchsorted(id))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == id:
+            return int(self.order[i])
+        return default
+
+    def __contains__(self, id):
+        return self.get(id) is not None
+
+    def __getitem__(self, id):
+        pos = self.get(id)
+        if pos is None:
+            raise KeyError(id)
+        return pos
+
+    def lookup(self, ids):
+        '''Positions de plusieurs identifiants (-1 pour les inconnus), vectorisé'''
+        ids = np.asarray(ids)
+        if not len(self.sorted_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self.sorted_ids, ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[i] == ids, self.order[i], -1).astype(np.int64)
+
+
+def positions_for(ids, index=None):
+    '''Positions de ``ids`` : celles de ``index`` s'il porte les mêmes identifiants
+    dans le même ordre (rien n'est construit), sinon de nouvelles'''
+    if index is not None and (ids is index.ids or np.array_equal(ids, index.ids)):
+        return index.positions
+    return IdPositions(ids)
+
+
+class ClientIndex:
+    '''Accès direct aux lignes d'un DataFrame indexé par SK_ID_CURR.
+
+    Si ``matrix`` est vrai, les colonnes numériques sont aussi rangées dans une
+    matrice contiguë (ligne par ligne) : la ligne d'un client est alors une vue
+    NumPy, directement utilisable par le modèle. ``matrix`` peut aussi être cette
+    matrice déjà construite (par exemple partagée en memory-map, voir core.shared).
+    De même, ``positions`` peut être un ``IdPositions`` déjà construit.
+    '''
+
+    def __init__(self, frame, matrix=True, positions=None):
+        self.frame = frame
+        self.ids = frame.index.to_numpy()
+        self.positions = IdPositions(self.ids) if positions is None else positions
+        self.sorted_ids = self.positions.sorted_ids
+        self.columns = None
+        self.matrix = None
+        if isinstance(matrix, np.ndarray):
+            self.columns = frame.select_dtypes('number').columns
+            self.matrix = matrix
+        elif matrix:
+            numeric = frame.select_dtypes('number')
+            self.columns = numeric.columns
+            #Plus petit type commun sans perte (float32 si les colonnes ont été compactées)
+            dtype = np.result_type(np.float32, *numeric.dtypes)
+            self.matrix = np.ascontiguousarray(numeric.to_numpy(dtype=dtype))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return int(id) in self.positions
+
+    def position(self, id):
+        '''Position de la ligne du client (KeyError si le client est inconnu)'''
+        return self.positions[int(id)]
+
+    def row(self, id):
+        '''Ligne numérique du client (vue sur la matrice, sans copie)'''
+        return self.matrix[self.position(id)]
+
+    def record(self, id):
+        '''Dossier du client sous forme de DataFrame d'une ligne'''
+        pos = self.position(id)
+        return self.frame.iloc[pos:pos + 1]
+
+    def records(self, ids):
+        '''Dossiers de plusieurs clients, dans l'ordre donné (clients inconnus ignorés)'''
+        positions = self.positions.lookup(np.asarray(ids, dtype=self.ids.dtype))
+        return self.frame.iloc[positions[positions >= 0]]
+
+    def between(self, low, high, limit=None):
+        '''Identifiants compris entre low et high (inclus), par ordre croissant'''
+        start = np.searchsorted(self.sorted_ids, low, side='left')
+        stop = np.searchsorted(self.sorted_ids, high, side='right')
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return self.sorted_ids[start:stop]
+
+    def search(self, query, limit=20):
+        '''Au plus ``limit`` identifiants commençant par ``query``, ou dans l'intervalle "début-fin"'''
+        query = query.strip().replace(' ', '')
+        empty = self.sorted_ids[:0]
+        if not query:
+            return self.sorted_ids[:limit]
+        if '-' in query:
+            low, _, high = query.partition('-')
+            if not (low.isdigit() and high.isdigit()):
+                return empty
+            return self.between(int(low), int(high), limit)
+        #Les identifiants ne commencent jamais par 0
+        if not query.isdigit() or query[0] == '0' or not len(self.sorted_ids):
+            return empty
+        #Identifiants de même longueur que la requête, puis d'un chiffre de plus, etc. :
+        #chaque longueur est un intervalle [préfixe * 10^k, (préfixe + 1) * 10^k[
+        prefix, found, n_found = int(query), [], 0
+        for extra in range(len(str(int(self.sorted_ids[-1]))) - len(query) + 1):
+            scale = 10 ** extra
+            ids = self.between(prefix * scale, (prefix + 1) * scale - 1, limit - n_found)
+            found.append(ids)
+            n_found += len(ids)
+            if n_found >= limit:
+                break
+        return np.concatenate(found) if found else empty
@@ -0,0 +1,71 @@
+'''Compactage des colonnes de ``data`` et ``sample`` (types numériques réduits, catégories).
+
+Le catalogue des colonnes (``data/features_description.csv``) sert de schéma :
+les colonnes texte qu'il décrit (NAME_CONTRACT_TYPE, CODE_GENDER...) deviennent
+des catégories ; les colonnes texte inconnues ne le deviennent que si elles ont
+peu de valeurs distinctes. Les réductions de type numériques sont sans perte :
+entiers au plus petit type suffisant, flottants entiers convertis en entiers,
+float64 en float32 seulement si toutes les valeurs sont exactement représentables.
+Les prédictions du modèle restent donc identiques.
+'''
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+from core import config
+
+
+#Part maximale de valeurs distinctes pour convertir une colonne texte hors catalogue
+MAX_UNIQUE_RATIO = 0.5
+
+
+def read_catalog(path=None):
+    '''Noms des colonnes décrites dans le catalogue (features_description.csv)'''
+    catalog = pd.read_csv(path or config.DESCRIPTION_PATH, usecols=['Row'], encoding='unicode_escape')
+    return set(catalog['Row'].str.strip())
+
+
+def _compact_numeric(col):
+    if is_bool_dtype(col.dtype):
+        return col
+    if is_integer_dtype(col.dtype):
+        return pd.to_numeric(col, downcast='integer')
+    values = col.to_numpy(dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if len(finite) == len(values) and np.array_equal(finite, np.round(finite)):
+        return pd.to_numeric(col, downcast='integer')
+    if np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+        return col.astype(np.float32)
+    return col
+
+
+def compact_column(col, in_catalog):
+    '''Colonne au type le plus compact sans perte d'information'''
+    if is_numeric_dtype(col.dtype):
+        return _compact_numeric(col)
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col
+    if in_catalog or col.nunique(dropna=True) <= MAX_UNIQUE_RATIO * len(col):
+        return col.astype('category')
+    return col
+
+
+def compact_frame(frame, catalog=None):
+    '''(DataFrame compacté, rapport mémoire par colonne)'''
+    catalog = read_catalog() if catalog is None else catalog
+    columns, rows = {}, []
+    for name, col in frame.items():
+        compacted = compact_column(col, name in catalog)
+        columns[name] = compacted
+        rows.append({'colonne': name, 'catalogue': name in catalog,
+                     'type avant': str(col.dtype), 'type après': str(compacted.dtype),
+                     'mémoire avant (o)': int(col.memory_usage(index=False, deep=True)),
+                     'mémoire après (o)': int(compacted.memory_usage(index=False, deep=True))})
+    return pd.DataFrame(columns, index=frame.index), pd.DataFrame(rows)
+
+
+def summary(report):
+    '''Mémoire totale avant/après et facteur de réduction d'un rapport de compactage'''
+    before = report['mémoire avant (o)'].sum()
+    after = report['mémoire après (o)'].sum()
+    return before, after, before / after if after else float('inf')
@@ -0,0 +1,79 @@
+'''Chemins et paramètres communs au tableau de bord.
+
+Les chemins sont relatifs au dossier de lancement (racine du dépôt), comme dans
+``app/app.py``. Chaque valeur peut être surchargée par une variable d'environnement.
+'''
+import os
+
+
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", "data")
+MODEL_DIR = os.environ.get("DASHBOARD_MODEL_DIR", "model")
+
+#Stockage colonnaire généré par ``python app/prepare_data.py convert``
+STORE_DIR = os.environ.get("DASHBOARD_STORE_DIR", os.path.join(DATA_DIR, "store"))
+
+#Source des données : "auto" (stockage colonnaire si disponible, sinon CSV), "store" ou "csv"
+DATA_SOURCE = os.environ.get("DASHBOARD_DATA_SOURCE", "auto")
+
+#Compactage des colonnes au chargement (types réduits sans perte, catégories)
+COMPACT = os.environ.get("DASHBOARD_COMPACT", "1") == "1"
+
+MODEL_PATH = os.path.join(MODEL_DIR, "LGBMClassifier.pkl")
+#Booster LightGBM natif exporté (python app/prepare_data.py export-model)
+NATIVE_MODEL_PATH = os.path.join(MODEL_DIR, "LGBMClassifier.txt")
+#Format du modèle : "auto" (natif si exporté, sinon pickle), "native" ou "pickle"
+MODEL_FORMAT = os.environ.get("DASHBOARD_MODEL_FORMAT", "auto")
+DESCRIPTION_PATH = os.path.join(DATA_DIR, "features_description.csv")
+
+#Table des scores précalculés (python app/prepare_data.py score)
+SCORES_PATH = os.path.join(STORE_DIR, "scores.npz")
+
+#Contributions des variables par client (python app/prepare_data.py explain)
+EXPLANATIONS_PATH = os.path.join(STORE_DIR, "explanations.npz")
+
+#Segment de chaque client et centroïdes (python app/prepare_data.py segment), et modèle de
+#segmentation mis à jour avec les nouvelles demandes (--update)
+SEGMENTS_PATH = os.path.join(STORE_DIR, "segments.npz")
+SEGMENTATION_MODEL_PATH = os.path.join(MODEL_DIR, "segmentation.pkl")
+
+#Statistiques de population précalculées (python app/prepare_data.py stats)
+STATS_PATH = os.path.join(STORE_DIR, "stats.json")
+
+#Graphiques de population rendus une fois par version des données
+FIGURES_DIR = os.path.join(STORE_DIR, "figures")
+
+#Nombre maximal de points du nuage Âge / Revenu envoyés au navigateur
+SCATTER_POINT_BUDGET = int(os.environ.get("DASHBOARD_SCATTER_POINTS", 5000))
+
+#Nombre maximal d'identifiants proposés par la recherche de client
+SEARCH_LIMIT = int(os.environ.get("DASHBOARD_SEARCH_LIMIT", 20))
+
+#Index des dossiers similaires, enregistré à côté du modèle (python app/prepare_data.py neighbors)
+NEIGHBORS_PATH = os.path.join(MODEL_DIR, "neighbors.npz")
+
+#Regroupement des demandes de scoring concurrentes (taille maximale du lot, attente en ms)
+BATCH_MAX_SIZE = int(os.environ.get("DASHBOARD_BATCH_MAX_SIZE", 64))
+BATCH_MAX_WAIT_MS = float(os.environ.get("DASHBOARD_BATCH_MAX_WAIT_MS", 2))
+
+#Déploiement multi-processus : répertoire des tableaux publiés par le chargeur et
+#partagés en memory-map par les workers (python app/serve.py). Vide : désactivé
+SHARED_DIR = os.environ.get("DASHBOARD_SHARED_DIR", "")
+
+#Caches par client : nombre d'entrées et durée de vie (secondes)
+CACHE_MAXSIZE = int(os.environ.get("DASHBOARD_CACHE_MAXSIZE", 256))
+CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 3600))
+
+#Variante du tableau de bord : "decision" (décision solvable / non solvable au seuil de
+#10%) ou "score" (probabilité et niveau de risque seuls, ancien app2.py).
+#Surchargeable par session avec ?variant=... dans l'URL
+VARIANTS = ("decision", "score")
+VARIANT = os.environ.get("DASHBOARD_VARIANT", "decision")
+
+#Panneau de debug dans la barre latérale
+DEBUG = os.environ.get("DASHBOARD_DEBUG", "0") == "1"
+
+#Instrumentation des performances (core.metrics) : durées des sections et des reruns,
+#activée avec le panneau de debug. Port du serveur Prometheus du tableau de bord
+#(0 : pas de serveur ; l'API expose toujours GET /metrics)
+METRICS = os.environ.get("DASHBOARD_METRICS", "1" if DEBUG else "0") == "1"
+METRICS_PORT = int(os.environ.get("DASHBOARD_METRICS_PORT", 0))
@@ -0,0 +1,201 @@
+'''Stockage colonnaire des données du tableau de bord.
+
+Les archives CSV zippées (``default_risk.zip`` et ``X_sample.zip``) sont converties
+une seule fois en fichiers Arrow/Feather non compressés. Au démarrage, ces fichiers
+sont ouverts en memory-map : les colonnes numériques sont lues sans copie, et les
+workers d'une même machine partagent les mêmes pages via le cache de l'OS.
+Les CSV restent utilisables comme source de repli.
+
+Dans les deux cas, les colonnes sont compactées (core.compaction) : types
+numériques réduits sans perte, colonnes texte en catégories.
+'''
+import hashlib
+import json
+import os
+from zipfile import ZipFile
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from core import compaction, config
+
+
+INDEX_COL = 'SK_ID_CURR'
+
+#nom logique -> (archive zip, fichier csv dans l'archive)
+SOURCES = {
+    'data': ('default_risk.zip', 'default_risk.csv'),
+    'sample': ('X_sample.zip', 'X_sample.csv'),
+}
+
+MANIFEST = 'manifest.json'
+
+
+def read_csv_source(name, data_dir=None):
+    '''Lecture d'une source depuis son archive CSV zippée'''
+    archive, member = SOURCES[name]
+    z = ZipFile(os.path.join(data_dir or config.DATA_DIR, archive))
+    return pd.read_csv(z.open(member), index_col=INDEX_COL, encoding='utf-8')
+
+
+def read_description(path=None):
+    '''Lecture du catalogue des colonnes (features_description.csv)'''
+    return pd.read_csv(path or config.DESCRIPTION_PATH,
+                       usecols=['Row', 'Description'], index_col=0, encoding='unicode_escape')
+
+
+def _file_signature(path):
+    '''Signature rapide (taille, date de modification) d'un fichier source'''
+    stat = os.stat(path)
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def file_hash(path, block_size=1 << 20):
+    '''Empreinte SHA-256 d'un fichier (archive, modèle...)'''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _version(hashes):
+    '''Version du jeu de données : empreinte combinée des archives sources'''
+    return hashlib.sha256(''.join(hashes).encode()).hexdigest()[:16]
+
+
+def _to_arrow(frame):
+    '''Conversion d'un DataFrame en table Arrow adaptée au memory-map.
+
+    Les colonnes numériques sont écrites sans masque de nullité (les NaN restent des
+    NaN) pour pouvoir être relues sans copie ; les colonnes texte deviennent des
+    catégories typées (dictionnaires Arrow).
+    '''
+    import pyarrow as pa
+
+    arrays = [pa.array(frame.index.to_numpy())]
+    for _, col in frame.items():
+        if is_numeric_dtype(col.dtype):
+            arrays.append(pa.array(col.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.array(pd.Categorical(col)))
+    return pa.table(arrays, names=[frame.index.name] + [str(name) for name in frame.columns])
+
+
+def read_compact_source(name, data_dir=None, catalog=None):
+    '''(DataFrame compacté, rapport mémoire par colonne) d'une archive CSV'''
+    frame = read_csv_source(name, data_dir)
+    if not config.COMPACT:
+        return frame, None
+    return compaction.compact_frame(frame, catalog)
+
+
+def convert_archives(data_dir=None, store_dir=None):
+    '''Conversion unique des archives CSV en fichiers Feather non compressés.
+
+    Un manifeste (``manifest.json``) garde la signature des archives converties
+    et la version du jeu de données. Renvoie le manifeste et les rapports de
+    compactage (mémoire par colonne) de chaque source.
+    '''
+    from pyarrow import feather
+
+    data_dir = data_dir or config.DATA_DIR
+    store_dir = store_dir or config.STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = {'index': INDEX_COL, 'sources': {}}
+    reports = {}
+    catalog = compaction.read_catalog()
+    for name, (archive, _) in SOURCES.items():
+        path = os.path.join(data_dir, archive)
+        frame, reports[name] = read_compact_source(name, data_dir, catalog)
+        #Un seul bloc par colonne : au-delà de 64k lignes (découpage par défaut), pandas
+        #devrait concaténer les blocs à la lecture, donc copier
+        feather.write_feather(_to_arrow(frame), os.path.join(store_dir, name + '.feather'),
+                              compression='uncompressed', chunksize=max(len(frame), 1))
+        manifest['sources'][name] = {'archive': archive,
+                                     'signature': _file_signature(path),
+                                     'sha256': file_hash(path),
+                                     'rows': int(frame.shape[0]),
+                                     'columns': int(frame.shape[1])}
+
+    manifest['version'] = _version(manifest['sources'][name]['sha256'] for name in SOURCES)
+    with open(os.path.join(store_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest, reports
+
+
+def read_manifest(store_dir=None):
+    '''Manifeste du stockage colonnaire, ou None s'il n'a pas été généré'''
+    path = os.path.join(store_dir or config.STORE_DIR, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_is_current(data_dir=None, store_dir=None):
+    '''Le stockage colonnaire existe-t-il et correspond-il aux archives actuelles ?'''
+    data_dir = data_dir or config.DATA_DIR
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        return False
+    for name, (archive, _) in SOURCES.items():
+        path = os.path.join(data_dir, archive)
+        if os.path.exists(path) and _file_signature(path) != manifest['sources'][name]['signature']:
+            return False
+    return True
+
+
+def dataset_version(data_dir=None, store_dir=None):
+    '''Version du jeu de données, lue dans le manifeste ou calculée sur les archives'''
+    if store_is_current(data_dir, store_dir):
+        return read_manifest(store_dir)['version']
+    data_dir = data_dir or config.DATA_DIR
+    return _version(file_hash(os.path.join(data_dir, archive)) for archive, _ in SOURCES.values())
+
+
+def source_columns(name, data_dir=None, store_dir=None):
+    '''Colonnes d'une source (hors SK_ID_CURR), sans charger les données'''
+    if store_is_current(data_dir, store_dir):
+        from pyarrow import feather
+        table = feather.read_table(os.path.join(store_dir or config.STORE_DIR, name + '.feather'),
+                                   memory_map=True)
+        return [col for col in table.column_names if col != INDEX_COL]
+    archive, member = SOURCES[name]
+    z = ZipFile(os.path.join(data_dir or config.DATA_DIR, archive))
+    return list(pd.read_csv(z.open(member), index_col=INDEX_COL, nrows=0).columns)
+
+
+def read_store(name, store_dir=None):
+    '''Ouverture en memory-map d'une table du stockage colonnaire'''
+    from pyarrow import feather
+
+    table = feather.read_table(os.path.join(store_dir or config.STORE_DIR, name + '.feather'),
+                               memory_map=True)
+    index = pd.Index(table.column(INDEX_COL).to_numpy(), name=INDEX_COL)
+    #split_blocks : une colonne par bloc pandas, sans consolidation (donc sans copie)
+    #select plutôt que drop_columns, absent des versions de pyarrow encore prises en charge
+    columns = [name for name in table.column_names if name != INDEX_COL]
+    frame = table.select(columns).to_pandas(split_blocks=True)
+    frame.index = index
+    return frame
+
+
+def load_frames(source=None, data_dir=None, store_dir=None):
+    '''Chargement de ``data`` et ``sample`` depuis le stockage colonnaire ou les CSV.
+
+    En mode "auto", le stockage colonnaire est utilisé s'il est à jour, sinon on
+    se rabat sur les archives CSV.
+    '''
+    source = source or config.DATA_SOURCE
+    if source == 'auto':
+        source = 'store' if store_is_current(data_dir, store_dir) else 'csv'
+
+    if source == 'store':
+        return read_store('data', store_dir), read_store('sample', store_dir)
+    if source == 'csv':
+        catalog = compaction.read_catalog() if config.COMPACT else None
+        return (read_compact_source('data', data_dir, catalog)[0],
+                read_compact_source('sample', data_dir, catalog)[0])
+    raise ValueError(f"Source de données inconnue : {source!r}")
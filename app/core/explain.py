@@ -0,0 +1,95 @@
+'''Explications locales des prédictions : contributions des variables par client.
+
+Les contributions (valeurs SHAP exactes des arbres, en log-odds) sont calculées
+par LightGBM lui-même (``pred_contrib=True``), par lots vectorisés, sans
+dépendre de la bibliothèque shap. Hors ligne (``python app/prepare_data.py
+explain``), elles sont calculées pour tout ``X_sample`` et rangées dans une
+matrice float32 indexée par SK_ID_CURR, avec la même clé que la table des
+scores (empreinte du modèle + version des données). Les clients absents de la
+table sont expliqués à la demande (voir ``core.service``).
+'''
+import os
+
+import numpy as np
+
+from core import config
+from core.client_index import positions_for
+from core.forest import booster_of
+
+
+def contributions(model, X, chunk_size=10_000):
+    '''(contributions float32 (lignes, variables), valeur de base) des lignes de X'''
+    booster = booster_of(model)
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    values = np.empty(X.shape, dtype=np.float32)
+    base = 0.0
+    for start in range(0, X.shape[0], chunk_size):
+        stop = start + chunk_size
+        #Dernière colonne : valeur de base (identique pour toutes les lignes)
+        contrib = booster.predict(X[start:stop], pred_contrib=True)
+        values[start:stop] = contrib[:, :-1]
+        base = float(contrib[0, -1])
+    return values, base
+
+
+def top_contributions(values, k=10):
+    '''Positions des k variables de plus forte contribution (en valeur absolue), par ordre décroissant'''
+    k = min(k, len(values))
+    top = np.argpartition(-np.abs(values), k - 1)[:k]
+    return top[np.argsort(-np.abs(values[top]), kind='stable')]
+
+
+class ExplanationTable:
+    '''Contributions précalculées des variables, indexées par SK_ID_CURR'''
+
+    def __init__(self, ids, values, base, key, index=None):
+        self.ids = ids
+        self.values = values
+        self.base = base
+        self.key = key
+        self.positions = positions_for(ids, index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return int(id) in self.positions
+
+    def row(self, id):
+        '''Contributions d'un client (vue sur la matrice)'''
+        return self.values[self.positions[int(id)]]
+
+    @classmethod
+    def build(cls, model, index, key, limit=None, chunk_size=10_000):
+        '''Contributions de l'échantillon (ClientIndex de sample, TARGET en dernière colonne).
+
+        ``limit`` restreint la table aux premiers clients : les autres seront
+        expliqués à la demande.
+        '''
+        stop = len(index) if limit is None else min(limit, len(index))
+        values, base = contributions(model, index.matrix[:stop, :-1], chunk_size)
+        return cls(index.ids[:stop], values, base, key)
+
+    def save(self, path=None):
+        path = path or config.EXPLANATIONS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, ids=self.ids, values=self.values, base=np.array(self.base), key=np.array(self.key))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None, index=None):
+        with np.load(path or config.EXPLANATIONS_PATH) as f:
+            return cls(f['ids'], f['values'], float(f['base']), str(f['key']), index)
+
+
+def load_explanation_table(key, path=None, index=None):
+    '''Table enregistrée si sa clé est à jour, sinon None (le calcul complet se fait hors ligne)'''
+    path = path or config.EXPLANATIONS_PATH
+    if os.path.exists(path):
+        table = ExplanationTable.load(path, index)
+        if table.key == key:
+            return table
+    return None
@@ -0,0 +1,118 @@
+'''Rendu en cache des graphiques matplotlib / seaborn du tableau de bord.
+
+Les graphiques de population (camembert, histogrammes des âges et des revenus)
+ne dépendent que de la version des données : ils sont dessinés une seule fois,
+hors de pyplot (aucune figure n'est retenue par le gestionnaire global de
+pyplot), puis servis sous forme d'image PNG. Pour les histogrammes, seul le
+marqueur du client (``axvline``) est redessiné à chaque requête sur le fond
+conservé (« blitting »).
+
+matplotlib et seaborn ne sont importés qu'au premier graphique dessiné ; les
+images déjà rendues pour une version des données sont relues depuis le
+stockage (``stored_png``), sans aucun import de bibliothèque graphique.
+'''
+import contextlib
+import functools
+import glob
+import io
+import os
+import threading
+
+import numpy as np
+
+from core import config
+
+
+#Résolution des images, celle utilisée par st.pyplot
+DPI = 200
+
+
+@functools.lru_cache(maxsize=None)
+def use_style():
+    '''Style des graphiques du tableau de bord, appliqué avant le premier graphique'''
+    import matplotlib.style
+    import seaborn as sns
+    matplotlib.style.use('fivethirtyeight')
+    sns.set_theme(style="darkgrid")
+
+
+def new_figure(figsize):
+    '''Figure et axes hors pyplot, libérés par le ramasse-miettes'''
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    use_style()
+    figure = Figure(figsize=figsize, dpi=DPI)
+    FigureCanvasAgg(figure)
+    return figure, figure.subplots()
+
+
+def to_png(pixels):
+    '''Image PNG d'un tampon RGBA (hauteur, largeur, 4)'''
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def render_png(figure):
+    '''Rendu complet d'une figure en PNG'''
+    figure.canvas.draw()
+    return to_png(np.asarray(figure.canvas.buffer_rgba()))
+
+
+def stored_png(name, version, render, directory=None):
+    '''PNG ``name`` de la version des données, relu depuis le stockage ou rendu par ``render()``'''
+    directory = directory or config.FIGURES_DIR
+    path = os.path.join(directory, f"{name}-{version}.png")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    png = render()
+    os.makedirs(directory, exist_ok=True)
+    #Les images des versions précédentes ne servent plus
+    for old in glob.glob(os.path.join(directory, f"{name}-*.png")):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(old)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(png)
+    os.replace(tmp, path)
+    return png
+
+
+class MarkerFigure:
+    '''Graphique de population rendu une fois, avec un marqueur vertical par client.
+
+    ``draw(ax)`` dessine la partie commune ; ``render(x)`` renvoie le PNG avec le
+    marqueur en ``x``. La figure est partagée entre les sessions : le rendu est
+    protégé par un verrou.
+    '''
+
+    def __init__(self, draw, figsize=(10, 5), **line):
+        self.figure, self.ax = new_figure(figsize)
+        draw(self.ax)
+        self.figure.tight_layout()
+        self.figure.canvas.draw()
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self.xlim = self.ax.get_xlim()
+        self.line = self.ax.axvline(self.xlim[0], animated=True, **line)
+        self._lock = threading.Lock()
+
+    def render(self, x):
+        canvas = self.figure.canvas
+        with self._lock:
+            self.line.set_xdata([x, x])
+            low, high = self.xlim
+            if low <= x <= high:
+                canvas.restore_region(self.background)
+                self.ax.draw_artist(self.line)
+                return to_png(np.asarray(canvas.buffer_rgba()))
+            #Marqueur hors de l'axe : rendu complet avec l'axe élargi, comme axvline
+            margin = 0.05 * (max(high, x) - min(low, x))
+            self.ax.set_xlim(min(low, x) - margin, max(high, x) + margin)
+            self.line.set_animated(False)
+            try:
+                return render_png(self.figure)
+            finally:
+                self.line.set_animated(True)
+                self.ax.set_xlim(low, high)
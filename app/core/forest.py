@@ -0,0 +1,180 @@
+'''Moteur d'inférence compilé pour le modèle LightGBM.
+
+Les arbres du booster sont exportés dans des tableaux plats (variable, seuil,
+enfants gauche/droit, traitement des valeurs manquantes, valeurs des feuilles)
+puis évalués en NumPy vectorisé sur des lots de lignes, sans passer par le
+wrapper sklearn ni par la validation des DataFrames pandas.
+
+Ce moteur n'est pas un format de service : chaque niveau des arbres coûte
+quelques appels NumPy, il reste plus lent que le booster natif, ligne à ligne
+comme par lots. Il sert d'implémentation de référence des règles de décision de
+LightGBM (parité vérifiée par ``python benchmarks/bench_compiled_forest.py --check``).
+
+Seules les coupures numériques sont prises en charge (le modèle du tableau de
+bord n'a pas de variable catégorielle).
+'''
+import numpy as np
+
+
+#Types de valeurs manquantes de LightGBM
+_MISSING_TYPES = {'None': 0, 'Zero': 1, 'NaN': 2}
+#En dessous de ce seuil, LightGBM considère une valeur comme nulle (kZeroThreshold,
+#défini comme le float 1e-35f : 1.0000000180025095e-35 en double)
+_ZERO_THRESHOLD = float(np.float32(1e-35))
+
+
+def booster_of(model):
+    '''Booster LightGBM d'un LGBMClassifier, d'un NativeModel, d'un CompiledForest ou d'un Booster'''
+    for attr in ('booster_', 'booster'):
+        if hasattr(model, attr):
+            return getattr(model, attr)
+    return model
+
+
+class CompiledForest:
+    '''Ensemble d'arbres en tableaux plats, évalué par lots.
+
+    Les enfants positifs désignent des nœuds internes, les enfants négatifs
+    des feuilles (``~indice`` dans ``leaf_value``).
+    '''
+
+    def __init__(self, roots, feature, threshold, left, right, default_left, missing_type,
+                 leaf_value, sigmoid, n_features):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.leaf_value = leaf_value
+        self.sigmoid = sigmoid
+        self.n_features_in_ = n_features
+        self._compile_levels()
+
+    def _compile_levels(self):
+        '''Tableaux du parcours à profondeur fixe : les feuilles deviennent des nœuds
+        numérotés après les nœuds internes, dont les deux enfants sont elles-mêmes'''
+        n_nodes, n_leaves = len(self.feature), len(self.leaf_value)
+        leaves = np.arange(n_nodes, n_nodes + n_leaves, dtype=np.int32)
+
+        def node_ids(children):
+            return np.where(children >= 0, children, n_nodes + ~children).astype(np.int32)
+
+        #Enfants gauche et droit côte à côte : l'enfant de ``node`` est ``_children[2 * node + à_droite]``
+        self._children = np.column_stack([np.concatenate([node_ids(self.left), leaves]),
+                                          np.concatenate([node_ids(self.right), leaves])]).ravel()
+        self._feature = np.concatenate([self.feature, np.zeros(n_leaves, dtype=np.int32)])
+        self._threshold = np.concatenate([self.threshold, np.zeros(n_leaves)])
+        self._default_left = np.concatenate([self.default_left, np.zeros(n_leaves, dtype=bool)])
+        self._missing_type = np.concatenate([self.missing_type, np.zeros(n_leaves, dtype=np.int8)])
+        self._roots = node_ids(self.roots)
+        self._has_missing = bool(self.missing_type.any())
+        #Profondeur maximale : nombre d'étapes pour que toutes les lignes atteignent une feuille
+        self.depth, level = 0, self.roots[self.roots >= 0]
+        while level.size:
+            children = np.concatenate([self.left[level], self.right[level]])
+            self.depth, level = self.depth + 1, children[children >= 0]
+
+    @classmethod
+    def from_model(cls, model):
+        '''Compilation d'un modèle LightGBM binaire (LGBMClassifier, NativeModel ou Booster)'''
+        booster = booster_of(model)
+        dump = booster.dump_model()
+        objective = dump['objective'].split()
+        if objective[0] != 'binary' or dump['num_tree_per_iteration'] != 1:
+            raise NotImplementedError(f"Objectif non pris en charge : {dump['objective']}")
+        sigmoid = 1.0
+        for param in objective[1:]:
+            if param.startswith('sigmoid:'):
+                sigmoid = float(param.split(':')[1])
+
+        nodes = {'feature': [], 'threshold': [], 'left': [], 'right': [],
+                 'default_left': [], 'missing_type': []}
+        leaf_value = []
+
+        def flatten(node):
+            if 'leaf_value' in node:
+                leaf_value.append(node['leaf_value'])
+                return ~(len(leaf_value) - 1)
+            if node['decision_type'] != '<=':
+                raise NotImplementedError("Coupures catégorielles non prises en charge")
+            i = len(nodes['feature'])
+            for key, value in [('feature', node['split_feature']), ('threshold', node['threshold']),
+                               ('left', 0), ('right', 0), ('default_left', node['default_left']),
+                               ('missing_type', _MISSING_TYPES[node['missing_type']])]:
+                nodes[key].append(value)
+            nodes['left'][i] = flatten(node['left_child'])
+            nodes['right'][i] = flatten(node['right_child'])
+            return i
+
+        roots = [flatten(tree['tree_structure']) for tree in dump['tree_info']]
+        forest = cls(np.array(roots, dtype=np.int32),
+                   np.array(nodes['feature'], dtype=np.int32),
+                   np.array(nodes['threshold'], dtype=np.float64),
+                   np.array(nodes['left'], dtype=np.int32),
+                   np.array(nodes['right'], dtype=np.int32),
+                   np.array(nodes['default_left'], dtype=bool),
+                   np.array(nodes['missing_type'], dtype=np.int8),
+                   np.array(leaf_value, dtype=np.float64),
+                   sigmoid, dump['max_feature_idx'] + 1)
+        #Booster d'origine conservé pour les explications (core.explain)
+        forest.booster = booster
+        return forest
+
+    def _go_right(self, current, fval):
+        '''Vrai si la ligne part à droite, même règle que LightGBM (NumericalDecision).
+        Sans traitement spécifique des manquants, les NaN ont déjà été remplacés par 0.'''
+        threshold = self._threshold.take(current)
+        if not self._has_missing:
+            return fval > threshold
+        isnan = np.isnan(fval)
+        missing_type = self._missing_type.take(current)
+        fval = np.where(isnan & (missing_type != 2), 0.0, fval)
+        to_default = (((missing_type == 1) & (np.abs(fval) <= _ZERO_THRESHOLD))
+                      | ((missing_type == 2) & isnan))
+        return np.where(to_default, ~self._default_left.take(current), ~(fval <= threshold))
+
+    def _leaves(self, X):
+        '''Indice de la feuille atteinte dans chaque arbre, pour chaque ligne (n, arbres).
+
+        Toutes les paires (ligne, arbre) avancent d'un niveau à chaque étape, pendant
+        ``depth`` étapes (une feuille reste sur place) : ni sélection des paires
+        actives ni tableaux d'indices intermédiaires, une seule ligne ne coûte que
+        ``depth`` fois quelques opérations NumPy sur ``n_trees`` éléments.
+        '''
+        #Comme le prédicteur de LightGBM, les valeurs quasi nulles sont lues comme 0
+        #(et, sans traitement spécifique des manquants, les NaN aussi)
+        zero = np.abs(X) <= _ZERO_THRESHOLD
+        if not self._has_missing:
+            zero |= np.isnan(X)
+        X = np.where(zero, 0.0, X)
+        #Position de la ligne dans X aplati, ajoutée à la variable du nœud
+        offsets = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        flat = X.ravel()
+        node = np.broadcast_to(self._roots, (X.shape[0], len(self._roots)))
+        for _ in range(self.depth):
+            fval = flat.take(offsets + self._feature.take(node))
+            node = self._children.take(2 * node + self._go_right(node, fval))
+        return node - len(self.feature)
+
+    def predict_raw(self, X, chunk_size=10_000):
+        '''Score brut (somme des feuilles) de chaque ligne'''
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        raw = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            raw[start:stop] = self.leaf_value[self._leaves(X[start:stop])].sum(axis=1)
+        return raw
+
+    def predict_proba(self, X):
+        '''Probabilités des deux classes, comme LGBMClassifier.predict_proba'''
+        proba = 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(X)))
+        return np.column_stack([1 - proba, proba])
+
+
+def check_parity(model, forest, X):
+    '''Écart maximal entre les probabilités du modèle d'origine et du moteur compilé'''
+    return float(np.max(np.abs(model.predict_proba(X)[:, 1] - forest.predict_proba(X)[:, 1])))
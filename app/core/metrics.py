@@ -0,0 +1,236 @@
+'''Instrumentation des performances : durées des sections, reruns, caches, mémoire.
+
+Activée par ``DASHBOARD_METRICS=1`` (ou ``DASHBOARD_DEBUG=1``). Désactivée,
+``span`` renvoie un contexte vide partagé et ``clock`` renvoie None : le coût
+est celui d'un appel de fonction, rien n'est mesuré ni conservé.
+
+Les durées sont rangées dans des histogrammes à seaux fixes (comme Prometheus),
+partagés par toutes les sessions du processus ; chaque session garde en plus
+l'histogramme de ses propres reruns (panneau de debug). ``render`` produit le
+format texte de Prometheus : ``GET /metrics`` de l'API, ou serveur HTTP dédié du
+tableau de bord (``DASHBOARD_METRICS_PORT``).
+'''
+import bisect
+import contextlib
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import cache, config
+
+
+ENABLED = config.METRICS
+
+#Bornes supérieures des seaux (secondes)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class Histogram:
+    '''Histogramme de durées à seaux fixes (effectifs non cumulés, dernier seau : +Inf)'''
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def quantile(self, q):
+        '''Borne supérieure du seau contenant le quantile q (None sans observation)'''
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def summary(self):
+        return {'n': self.count, 'moyenne (ms)': 1e3 * self.sum / self.count if self.count else None,
+                'p50 (ms) ≤': _ms(self.quantile(0.5)), 'p95 (ms) ≤': _ms(self.quantile(0.95))}
+
+
+def _ms(seconds):
+    return None if seconds is None else 1e3 * seconds
+
+
+#(nom de la métrique, libellé) -> Histogram
+_HISTOGRAMS = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+
+def histogram(name, label=None):
+    key = (name, label)
+    h = _HISTOGRAMS.get(key)
+    if h is None:
+        with _HISTOGRAMS_LOCK:
+            h = _HISTOGRAMS.setdefault(key, Histogram())
+    return h
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        histogram('dashboard_span_seconds', self.name).observe(time.perf_counter() - self.start)
+        return False
+
+
+def span(name):
+    '''Contexte mesurant la durée d'une section (chargeur, rendu, requête)'''
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def timed(name):
+    '''Décorateur : chaque appel de la fonction est mesuré comme une section'''
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def clock():
+    '''Début d'un rerun (None si l'instrumentation est désactivée)'''
+    return time.perf_counter() if ENABLED else None
+
+
+def observe_rerun(start, session_state=None):
+    '''Fin d'un rerun : histogramme du processus et, si fourni, de la session'''
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    histogram('dashboard_rerun_seconds').observe(seconds)
+    if session_state is not None:
+        if '_metrics_reruns' not in session_state:
+            session_state['_metrics_reruns'] = Histogram()
+        session_state['_metrics_reruns'].observe(seconds)
+
+
+def session_reruns(session_state):
+    '''Histogramme des reruns de la session (None si aucun n'a été mesuré)'''
+    return session_state.get('_metrics_reruns')
+
+
+def span_summaries():
+    '''Résumé de chaque section mesurée, pour le panneau de debug'''
+    with _HISTOGRAMS_LOCK:
+        items = sorted((label, h) for (name, label), h in _HISTOGRAMS.items() if name == 'dashboard_span_seconds')
+    return [{'section': label, **h.summary()} for label, h in items]
+
+
+def resident_memory():
+    '''Mémoire résidente du processus en octets (Linux), sinon pic de mémoire résidente'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels.items()) + '}' if labels else ''
+
+
+def _render_histogram(lines, name, label_name, label, h):
+    base = {label_name: label} if label is not None else {}
+    with h._lock:
+        counts, total, count = list(h.counts), h.sum, h.count
+    cumulative = 0
+    for bound, n in zip(h.buckets + (float('inf'),), counts):
+        cumulative += n
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{_labels(**base, le=le)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**base)} {total}')
+    lines.append(f'{name}_count{_labels(**base)} {count}')
+
+
+def render():
+    '''Métriques du processus au format texte de Prometheus'''
+    lines = []
+    with _HISTOGRAMS_LOCK:
+        histograms = sorted(_HISTOGRAMS.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+    helps = {'dashboard_span_seconds': ('span', "Durée des sections instrumentées"),
+             'dashboard_rerun_seconds': (None, "Durée des reruns complets de la page")}
+    for name, (label_name, help) in helps.items():
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+        for (metric, label), h in histograms:
+            if metric == name:
+                _render_histogram(lines, name, label_name, label, h)
+
+    caches = cache.all_caches()
+    for name, attr, kind, help in [('dashboard_cache_hits_total', 'hits', 'counter', "Succès des caches"),
+                                   ('dashboard_cache_misses_total', 'misses', 'counter', "Échecs des caches"),
+                                   ('dashboard_cache_evictions_total', 'evictions', 'counter', "Évictions des caches"),
+                                   ('dashboard_cache_entries', '__len__', 'gauge', "Entrées des caches")]:
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+        for c in caches:
+            value = len(c) if attr == '__len__' else getattr(c, attr)
+            lines.append(f'{name}{_labels(cache=c.name)} {value}')
+
+    lines += ['# HELP process_resident_memory_bytes Mémoire résidente du processus',
+              '# TYPE process_resident_memory_bytes gauge',
+              f'process_resident_memory_bytes {resident_memory()}']
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def start_http_server(port):
+    '''Serveur ``GET /metrics`` du processus (une seule fois par port), dans un thread.
+
+    Si le port est déjà pris, l'erreur est journalisée une fois et la page continue
+    d'être servie sans serveur de métriques (None, mis en cache comme un succès).
+    '''
+    try:
+        server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    except OSError as error:
+        logging.getLogger(__name__).warning("Serveur de métriques non démarré sur le port %s : %s", port, error)
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,136 @@
+'''Chargement partagé du modèle de scoring.
+
+Le classifieur est chargé une seule fois par processus et partagé entre les
+sessions. Il est « chauffé » par une prédiction factice au chargement, puis
+rechargé à chaud si le fichier du modèle change (date de modification, puis
+empreinte). Le booster LightGBM natif (``model/LGBMClassifier.txt``) peut
+remplacer le pickle sklearn : chargement et prédiction ligne à ligne plus rapides.
+En mode "auto", il n'est utilisé que s'il n'est pas plus ancien que le pickle : un
+modèle réentraîné qui remplace le pickle est chargé même si l'export est resté.
+'''
+import functools
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from core import config
+from core.datastore import file_hash
+
+
+class NativeModel:
+    '''Booster LightGBM natif, avec la même interface predict_proba que LGBMClassifier'''
+
+    def __init__(self, booster):
+        self.booster = booster
+        self.n_features_in_ = booster.num_feature()
+
+    def predict_proba(self, X):
+        proba = self.booster.predict(np.asarray(X, dtype=np.float64))
+        return np.column_stack([1 - proba, proba])
+
+
+def export_native(clf, path=None):
+    '''Export du booster d'un LGBMClassifier au format texte natif de LightGBM'''
+    path = path or config.NATIVE_MODEL_PATH
+    clf.booster_.save_model(path)
+    return path
+
+
+def warm_up(model):
+    '''Prédiction factice : initialise les structures internes avant la première requête'''
+    model.predict_proba(np.zeros((1, model.n_features_in_)))
+
+
+#Formats de service (DASHBOARD_MODEL_FORMAT)
+MODEL_FORMATS = ('auto', 'native', 'pickle')
+
+
+class ModelRegistry:
+    '''Modèle partagé par processus, rechargé à chaud si son fichier change'''
+
+    def __init__(self, path=None, native_path=None, model_format=None):
+        self.path = path or config.MODEL_PATH
+        #Export natif à côté du pickle demandé (model/LGBMClassifier.txt par défaut)
+        if native_path is None:
+            native_path = config.NATIVE_MODEL_PATH if path is None else os.path.splitext(path)[0] + '.txt'
+        self.native_path = native_path
+        self.model_format = model_format or config.MODEL_FORMAT
+        if self.model_format not in MODEL_FORMATS:
+            raise ValueError(f"Format de modèle inconnu : {self.model_format!r}")
+        self.model = None
+        self.source = None
+        self.sha = None
+        self._signature = None
+        self._fingerprint = (None, None)
+        self._lock = threading.Lock()
+
+    def _native_is_current(self):
+        '''Vrai si le booster natif existe et n'est pas plus ancien que le pickle'''
+        try:
+            native = os.stat(self.native_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        try:
+            return native >= os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+
+    def _source(self):
+        if self.model_format == 'native' or (self.model_format == 'auto' and self._native_is_current()):
+            return self.native_path
+        return self.path
+
+    def _load(self, source):
+        if source == self.native_path:
+            import lightgbm as lgb
+            model = NativeModel(lgb.Booster(model_file=source))
+        else:
+            with open(source, 'rb') as f:
+                model = pickle.load(f)
+        return model
+
+    def _stat(self):
+        source = self._source()
+        stat = os.stat(source)
+        return source, (source, stat.st_mtime_ns, stat.st_size)
+
+    def source_path(self):
+        '''Fichier du modèle qui est (ou serait) chargé, sans le charger'''
+        return self._source()
+
+    def fingerprint(self):
+        '''Empreinte du fichier du modèle courant, sans charger le modèle'''
+        source, signature = self._stat()
+        if signature != self._fingerprint[0]:
+            self._fingerprint = (signature, file_hash(source))
+        return self._fingerprint[1]
+
+    def get(self):
+        '''Modèle courant ; rechargé si le fichier a changé depuis le dernier appel'''
+        source, signature = self._stat()
+        if signature == self._signature:
+            return self.model
+
+        with self._lock:
+            if signature != self._signature:
+                sha = self.fingerprint()
+                if sha != self.sha or source != self.source:
+                    model = self._load(source)
+                    warm_up(model)
+                    self.model, self.source, self.sha = model, source, sha
+                self._signature = signature
+        return self.model
+
+
+def registry_for(path=None, model_format=None):
+    '''Registre d'un modèle demandé explicitement (``--model``) : c'est ce pickle qui
+    est chargé, jamais l'export natif du modèle par défaut. Sans ``path``, modèle courant.'''
+    return ModelRegistry(path=path, model_format=model_format or ('pickle' if path else None))
+
+
+@functools.lru_cache(maxsize=None)
+def get_registry():
+    '''Registre unique du processus (partagé par toutes les sessions)'''
+    return ModelRegistry()
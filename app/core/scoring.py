@@ -0,0 +1,111 @@
+'''Scoring du portefeuille et table des scores précalculés.
+
+Le modèle est appliqué en lots vectorisés sur tout ``X_sample`` ; les probabilités
+de défaut et les niveaux de risque sont enregistrés dans une table indexée par
+SK_ID_CURR. La table porte une clé (empreinte du modèle + version des données) :
+elle n'est recalculée que si le fichier du modèle ou les données changent.
+'''
+import os
+
+import numpy as np
+
+from core import config
+from core.client_index import positions_for
+
+
+#Niveaux de risque : (borne supérieure exclue en %, libellé, couleur d'affichage)
+RISK_BANDS = [
+    (1, "Très faible", "green"),
+    (5, "Faible", "green"),
+    (10, "Moyen", "blue"),
+    (20, "Elevé", "orange"),
+    (np.inf, "Très élevé", "red"),
+]
+
+#Seuil de décision (%) : au-delà, le client est jugé non solvable
+DECISION_THRESHOLD = 10
+
+_BAND_LIMITS = np.array([limit for limit, _, _ in RISK_BANDS[:-1]])
+
+
+def risk_band(proba):
+    '''Code du niveau de risque (indice dans RISK_BANDS) d'une ou plusieurs probabilités.
+
+    Comme à l'affichage, la probabilité est d'abord arrondie au pourcent.
+    '''
+    percent = np.round(np.asarray(proba) * 100)
+    return np.searchsorted(_BAND_LIMITS, percent, side='right').astype(np.int8)
+
+
+def table_key(model_sha, data_version):
+    '''Clé d'une table de scores : empreinte du modèle et version des données'''
+    return f"{model_sha[:16]}-{data_version}"
+
+
+def score_matrix(clf, X, chunk_size=50_000):
+    '''Probabilités de défaut de toutes les lignes de X, par lots vectorisés'''
+    proba = np.empty(X.shape[0], dtype=np.float64)
+    for start in range(0, X.shape[0], chunk_size):
+        stop = start + chunk_size
+        proba[start:stop] = clf.predict_proba(X[start:stop])[:, 1]
+    return proba
+
+
+class ScoreTable:
+    '''Probabilités et niveaux de risque du portefeuille, indexés par SK_ID_CURR'''
+
+    def __init__(self, ids, proba, bands, key, index=None):
+        self.ids = ids
+        self.proba = proba
+        self.bands = bands
+        self.key = key
+        #Positions de l'index de sample si les identifiants sont les mêmes (cas habituel)
+        self.positions = positions_for(ids, index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return int(id) in self.positions
+
+    def lookup(self, id):
+        '''(probabilité, code du niveau de risque) d'un client'''
+        pos = self.positions[int(id)]
+        return float(self.proba[pos]), int(self.bands[pos])
+
+    @classmethod
+    def build(cls, clf, index, key, chunk_size=50_000):
+        '''Scoring de tout l'échantillon (ClientIndex de sample, TARGET en dernière colonne)'''
+        proba = score_matrix(clf, index.matrix[:, :-1], chunk_size)
+        return cls(index.ids, proba, risk_band(proba), key, index)
+
+    def save(self, path=None):
+        path = path or config.SCORES_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        #écriture dans un fichier temporaire puis renommage : jamais de table à moitié écrite
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, ids=self.ids, proba=self.proba, bands=self.bands, key=np.array(self.key))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None, index=None):
+        with np.load(path or config.SCORES_PATH) as f:
+            return cls(f['ids'], f['proba'], f['bands'], str(f['key']), index)
+
+
+def load_score_table(clf, index, key, path=None, chunk_size=50_000):
+    '''Table des scores enregistrée si sa clé est à jour, sinon recalcul et sauvegarde.
+
+    ``clf`` peut être une fonction sans argument renvoyant le modèle : il n'est
+    alors chargé que si la table doit être recalculée.
+    '''
+    path = path or config.SCORES_PATH
+    if os.path.exists(path):
+        table = ScoreTable.load(path, index)
+        if table.key == key:
+            return table
+    if not hasattr(clf, 'predict_proba'):
+        clf = clf()
+    table = ScoreTable.build(clf, index, key, chunk_size)
+    table.save(path)
+    return table
@@ -0,0 +1,187 @@
+'''Segmentation des clients, entraînée hors ligne par morceaux.
+
+Remplace l'ancien ``KMeans(n_clusters=2)`` entraîné dans la page, sur tout
+``sample`` en mémoire et avec TARGET parmi les variables. Ici (``python
+app/prepare_data.py segment``) :
+
+* les variables de ``X_sample`` (sans TARGET) sont lues par morceaux : tranches
+  du stockage colonnaire en memory-map, ou archive CSV lue en flux ;
+* un premier passage estime la standardisation (``StandardScaler.partial_fit``),
+  les suivants mettent à jour les centroïdes par mini-lots
+  (``MiniBatchKMeans.partial_fit``) : la mémoire ne dépend que de la taille
+  des morceaux ;
+* le modèle (``model/segmentation.pkl``) peut être mis à jour avec de nouvelles
+  demandes (``--update``), sans réentraînement complet ; la standardisation
+  reste alors inchangée pour que les centroïdes restent comparables ;
+* les centroïdes et le segment de chaque client sont enregistrés dans une
+  petite table (``data/store/segments.npz``) : le tableau de bord ne fait que
+  la lire, scikit-learn n'y est jamais importé.
+'''
+import os
+import pickle
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+
+from core import config, datastore
+from core.client_index import positions_for
+from core.datastore import INDEX_COL
+
+
+N_CLUSTERS = 2
+TARGET = 'TARGET'
+
+
+def sample_chunks(chunk_size=50_000, data_dir=None, store_dir=None):
+    '''(identifiants, variables en float64) de X_sample par morceaux, sans charger toute la table'''
+    if datastore.store_is_current(data_dir, store_dir):
+        from pyarrow import feather
+        table = feather.read_table(os.path.join(store_dir or config.STORE_DIR, 'sample.feather'),
+                                   memory_map=True)
+        features = [col for col in table.column_names if col not in (INDEX_COL, TARGET)]
+        #Tranches du fichier en memory-map : seul le morceau courant est converti
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            X = np.column_stack([batch.column(name).to_numpy(zero_copy_only=False) for name in features])
+            yield batch.column(INDEX_COL).to_numpy(), X.astype(np.float64, copy=False)
+        return
+    archive, member = datastore.SOURCES['sample']
+    with ZipFile(os.path.join(data_dir or config.DATA_DIR, archive)) as z:
+        for chunk in pd.read_csv(z.open(member), chunksize=chunk_size):
+            yield (chunk[INDEX_COL].to_numpy(),
+                   chunk.drop(columns=[INDEX_COL, TARGET], errors='ignore').to_numpy(dtype=np.float64))
+
+
+def file_chunks(path, features, chunk_size=50_000):
+    '''(identifiants, variables) d'un fichier de nouvelles demandes (CSV ou CSV zippé), par morceaux'''
+    from core.streaming import align_chunk
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        if INDEX_COL not in chunk.columns:
+            raise ValueError(f"Colonne {INDEX_COL} absente de {path}")
+        yield chunk[INDEX_COL].to_numpy(), align_chunk(chunk, features)
+
+
+class SegmentationModel:
+    '''Standardisation et k-moyennes par mini-lots, entraînées morceau par morceau'''
+
+    def __init__(self, n_clusters=N_CLUSTERS, batch_size=4096, random_state=0):
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
+        self.kmeans = MiniBatchKMeans(n_clusters, batch_size=batch_size, random_state=random_state, n_init=3)
+
+    @property
+    def n_clusters(self):
+        return self.kmeans.n_clusters
+
+    @property
+    def centroids(self):
+        '''Centroïdes dans l'espace des variables d'origine'''
+        return self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+
+    def _scaled(self, X):
+        #Valeurs manquantes imputées par la moyenne (0 après standardisation)
+        return np.nan_to_num(self.scaler.transform(X))
+
+    def fit(self, chunks, epochs=1):
+        '''Entraînement complet ; ``chunks`` : fonction sans argument renvoyant les morceaux (ids, X)'''
+        for _, X in chunks():
+            self.scaler.partial_fit(X)
+        for _ in range(epochs):
+            for _, X in chunks():
+                self.partial_fit(X)
+        return self
+
+    def partial_fit(self, X):
+        '''Mise à jour des centroïdes avec de nouveaux dossiers, par mini-lots'''
+        Z = self._scaled(X)
+        step = self.kmeans.batch_size
+        for start in range(0, len(Z), step):
+            batch = Z[start:start + step]
+            #Le premier mini-lot initialise les centroïdes (k-means++) : il faut au moins k lignes
+            if len(batch) >= self.n_clusters or hasattr(self.kmeans, 'cluster_centers_'):
+                self.kmeans.partial_fit(batch)
+        return self
+
+    def predict(self, X):
+        return self.kmeans.predict(self._scaled(X)).astype(np.int16)
+
+    def label(self, chunks):
+        '''(identifiants, segments) de tous les morceaux'''
+        ids, labels = [], []
+        for chunk_ids, X in chunks:
+            ids.append(chunk_ids)
+            labels.append(self.predict(X))
+        if not ids:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int16)
+        return np.concatenate(ids), np.concatenate(labels)
+
+    def save(self, path=None):
+        path = path or config.SEGMENTATION_MODEL_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path=None):
+        with open(path or config.SEGMENTATION_MODEL_PATH, 'rb') as f:
+            return pickle.load(f)
+
+
+class SegmentTable:
+    '''Segment de chaque client et centroïdes, indexés par SK_ID_CURR'''
+
+    def __init__(self, ids, labels, centroids, key, index=None):
+        self.ids = ids
+        self.labels = labels
+        self.centroids = centroids
+        self.key = key
+        self.positions = positions_for(ids, index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return int(id) in self.positions
+
+    def lookup(self, id):
+        '''Segment d'un client'''
+        return int(self.labels[self.positions[int(id)]])
+
+    def counts(self):
+        '''Nombre de clients par segment'''
+        return np.bincount(self.labels, minlength=len(self.centroids))
+
+    def update(self, ids, labels, centroids):
+        '''Nouvelle table : segments de ``ids`` remplacés, nouveaux clients ajoutés à la fin'''
+        positions = self.positions.lookup(ids)
+        known = positions >= 0
+        updated = self.labels.copy()
+        updated[positions[known]] = labels[known]
+        return SegmentTable(np.concatenate([self.ids, ids[~known]]), np.concatenate([updated, labels[~known]]),
+                            centroids, self.key)
+
+    def save(self, path=None):
+        path = path or config.SEGMENTS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, ids=self.ids, labels=self.labels, centroids=self.centroids, key=np.array(self.key))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None, index=None):
+        with np.load(path or config.SEGMENTS_PATH) as f:
+            return cls(f['ids'], f['labels'], f['centroids'], str(f['key']), index)
+
+
+def load_segment_table(key, path=None, index=None):
+    '''Table enregistrée si sa clé (version des données) est à jour, sinon None (entraînement hors ligne)'''
+    path = path or config.SEGMENTS_PATH
+    if os.path.exists(path):
+        table = SegmentTable.load(path, index)
+        if table.key == key:
+            return table
+    return None
@@ -0,0 +1,246 @@
+'''Chargeurs partagés par le tableau de bord et l'API de scoring.
+
+Données, index clients, modèle, table des scores et index des dossiers similaires
+sont chargés une seule fois par processus (caches à clés explicites) et
+partagés par toutes les sessions et toutes les requêtes. En déploiement
+multi-processus (``core.shared``), les tableaux lourds publiés par le chargeur
+sont ouverts en memory-map au lieu d'être recalculés dans chaque processus.
+'''
+import functools
+import os
+
+import numpy as np
+
+from core import batching, cache, config, datastore, explain, metrics, model_registry, scoring, segmentation, shared, similarity, thresholds, whatif
+from core.client_index import ClientIndex, IdPositions
+
+
+#Les colonnes sont en memory-map (lecture seule) : les valeurs renvoyées ne doivent
+#pas être modifiées.
+@cache.memoize('data', maxsize=1)
+def load_data():
+    #Stockage colonnaire (python app/prepare_data.py convert), sinon archives CSV
+    data, sample = datastore.load_frames()
+
+    description = datastore.read_description()
+
+    target = data.iloc[:, -1:]
+
+    return data, sample, target, description
+
+
+@cache.memoize('client_index', maxsize=1)
+def load_client_index():
+    '''Index SK_ID_CURR -> ligne pour data et sample'''
+    data, sample, _, _ = load_data()
+    published = load_published(load_dataset_version())
+    if published is None:
+        return ClientIndex(data, matrix=False), ClientIndex(sample)
+    positions = IdPositions(published['sample_ids'], published['sample_sorted_ids'], published['sample_order'])
+    return (ClientIndex(data, matrix=False),
+            ClientIndex(sample, matrix=published['sample_matrix'], positions=positions))
+
+
+@cache.memoize('dataset_version', maxsize=1)
+def load_dataset_version():
+    return datastore.dataset_version()
+
+
+@cache.memoize('shared', key=lambda: shared.signature() if config.SHARED_DIR else None, maxsize=1)
+def _attach():
+    if not config.SHARED_DIR or shared.signature() is None:
+        return None
+    return shared.SharedData()
+
+
+def load_published(version):
+    '''Tableaux publiés par le chargeur pour cette version des données (déploiement
+    multi-processus), sinon None : chaque processus calcule alors les siens'''
+    published = _attach()
+    if published is None or published.version != version:
+        return None
+    return published
+
+
+def publish():
+    '''Chargeur du déploiement multi-processus : calcul puis publication des tableaux partagés'''
+    version = load_dataset_version()
+    _, index_sample = load_client_index()
+    return shared.publish(index_sample, current_scores(), load_neighbors(version), version)
+
+
+def load_model():
+    '''chargement du modèle entrainé (une fois par processus, rechargé si le fichier change)'''
+    clf = model_registry.get_registry().get()
+    return clf
+
+
+@cache.memoize('scores', maxsize=2)
+def load_scores(key):
+    '''Scores précalculés du portefeuille pour une version du modèle et des données'''
+    _, index_sample = load_client_index()
+    published = load_published(load_dataset_version())
+    if published is not None and published.manifest['score_key'] == key:
+        return scoring.ScoreTable(published['sample_ids'], published['score_proba'],
+                                  published['score_bands'], key, index_sample)
+    return scoring.load_score_table(load_model, index_sample, key)
+
+
+def current_key():
+    '''Clé des tables précalculées : empreinte du modèle courant et version des données.
+
+    Seule l'empreinte du fichier du modèle est nécessaire : le modèle (et lightgbm)
+    n'est pas chargé.
+    '''
+    return scoring.table_key(model_registry.get_registry().fingerprint(), load_dataset_version())
+
+
+def current_scores():
+    '''Table des scores du modèle courant (rechargée après un changement de modèle)'''
+    return load_scores(current_key())
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+#La signature du fichier fait partie de la clé : une table calculée hors ligne
+#pendant que le tableau de bord tourne est prise en compte immédiatement
+@cache.memoize('explanations', key=lambda key: (key, _file_signature(config.EXPLANATIONS_PATH)), maxsize=2)
+def load_explanations(key):
+    '''Contributions précalculées (None si absentes ou périmées)'''
+    _, index_sample = load_client_index()
+    return explain.load_explanation_table(key, index=index_sample)
+
+
+@cache.memoize('client_explanation', key=lambda key, id: (key, int(id)),
+               maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+@metrics.timed("explain_client")
+def _explain_client(key, id):
+    _, index_sample = load_client_index()
+    values, _ = explain.contributions(load_model(), index_sample.row(id)[:-1])
+    return values[0]
+
+
+def client_contributions(id):
+    '''Contributions des variables au score d'un client (KeyError si le client est inconnu).
+
+    Lues dans la table précalculée, sinon calculées à la demande et mises en cache.
+    '''
+    key = current_key()
+    table = load_explanations(key)
+    if table is not None and id in table:
+        return table.row(id)
+    return _explain_client(key, id)
+
+
+def _data_rows(ids, columns):
+    '''(clients connus, colonnes ``columns`` de leurs dossiers dans data) dans l'ordre de ``ids``.
+
+    Les colonnes sont sélectionnées avant les lignes : seules elles sont copiées.
+    '''
+    data = load_data()[0]
+    index_data, _ = load_client_index()
+    positions = index_data.positions.lookup(ids)
+    known = positions >= 0
+    return known, data[columns].iloc[positions[known]]
+
+
+def _portfolio(key):
+    '''(probabilités, colonnes utiles de data) des clients scorés, dans l'ordre de la table des scores'''
+    scores = load_scores(key)
+    known, frame = _data_rows(scores.ids, ['TARGET', 'AMT_CREDIT', *thresholds.SEGMENTS])
+    return scores.proba[known], frame
+
+
+@cache.memoize('thresholds', maxsize=2)
+def load_threshold_analysis(key):
+    '''Analyse du seuil de décision du portefeuille (scores triés une fois par version)'''
+    proba, frame = _portfolio(key)
+    return thresholds.ThresholdAnalysis(proba, frame['TARGET'], frame['AMT_CREDIT'])
+
+
+@cache.memoize('threshold_segments', maxsize=4)
+def load_threshold_segments(key, segment):
+    '''Analyses du seuil par valeur d'une colonne de data (thresholds.SEGMENTS)'''
+    proba, frame = _portfolio(key)
+    return thresholds.segment_analyses(proba, frame['TARGET'], frame['AMT_CREDIT'], frame[segment])
+
+
+@cache.memoize('feature_range', key=lambda version, feature: (version, feature), maxsize=64)
+def load_feature_range(version, feature):
+    '''Bornes des valeurs simulées d'une variable (centiles du portefeuille)'''
+    _, index_sample = load_client_index()
+    return whatif.feature_range(index_sample.matrix[:, feature_names().index(feature)])
+
+
+@cache.memoize('whatif', key=lambda key, id, x_feature, y_feature, steps: (key, int(id), x_feature, y_feature, steps),
+               maxsize=config.CACHE_MAXSIZE, ttl=config.CACHE_TTL)
+@metrics.timed("whatif_grid")
+def _whatif_grid(key, id, x_feature, y_feature, steps):
+    _, index_sample = load_client_index()
+    version = load_dataset_version()
+    return whatif.WhatIfGrid.build(load_model(), index_sample.row(id)[:-1], feature_names(), x_feature, y_feature,
+                                   load_feature_range(version, x_feature), load_feature_range(version, y_feature), steps)
+
+
+def whatif_grid(id, x_feature, y_feature, steps=whatif.GRID_STEPS):
+    '''Grille "what-if" d'un client pour deux variables (scorée en un seul appel au modèle,
+    mise en cache par modèle, client et couple de variables)'''
+    return _whatif_grid(current_key(), id, x_feature, y_feature, steps)
+
+
+#Comme les contributions : une segmentation recalculée hors ligne est prise en compte immédiatement
+@cache.memoize('segments', key=lambda version: (version, _file_signature(config.SEGMENTS_PATH)), maxsize=2)
+def load_segments(version):
+    '''Segments des clients (None si la segmentation n'a pas été calculée pour ces données)'''
+    _, index_sample = load_client_index()
+    return segmentation.load_segment_table(version, index=index_sample)
+
+
+@cache.memoize('segment_profile', key=lambda version: (version, _file_signature(config.SEGMENTS_PATH)), maxsize=2)
+def load_segment_profile(version):
+    '''Taille et taux de défaut observé (TARGET) de chaque segment, ou None'''
+    table = load_segments(version)
+    if table is None:
+        return None
+    known, frame = _data_rows(table.ids, ['TARGET'])
+    targets = frame['TARGET'].to_numpy(dtype=np.float64)
+    counts = table.counts()
+    defaults = np.bincount(table.labels[known], weights=np.nan_to_num(targets), minlength=len(counts))
+    observed = np.bincount(table.labels[known], weights=~np.isnan(targets), minlength=len(counts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {'clients': counts, 'part': counts / max(len(table), 1), 'taux de défaut': defaults / observed}
+
+
+@cache.memoize('neighbors', maxsize=2)
+def load_neighbors(version):
+    '''Index des dossiers similaires (reconstruit seulement si les données changent)'''
+    _, index_sample = load_client_index()
+    published = load_published(version)
+    if published is not None and published.manifest['neighbors_key'] == version:
+        return similarity.NeighborIndex(published['sample_ids'], published['neighbors_matrix'],
+                                        published['neighbors_mean'], published['neighbors_scale'],
+                                        version, norms=published['neighbors_norms'], index=index_sample)
+    return similarity.load_neighbor_index(index_sample, version)
+
+
+def feature_names():
+    '''Variables attendues par le modèle : colonnes de sample sans TARGET'''
+    _, index_sample = load_client_index()
+    return list(index_sample.columns[:-1])
+
+
+@metrics.timed("predict_proba")
+def _predict_current(X):
+    return load_model().predict_proba(X)[:, 1]
+
+
+@functools.lru_cache(maxsize=None)
+def get_batcher():
+    '''File de scoring du processus : les demandes concurrentes d'une ligne sont regroupées'''
+    return batching.MicroBatcher(_predict_current, config.BATCH_MAX_SIZE, config.BATCH_MAX_WAIT_MS)
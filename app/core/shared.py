@@ -0,0 +1,90 @@
+'''Données partagées entre processus pour le déploiement multi-processus.
+
+Un processus chargeur publie les tableaux lourds calculés au chargement (matrice
+des variables de ``sample``, identifiants et leur ordre de tri, table des scores, index des dossiers
+similaires) sous forme de fichiers ``.npy`` dans un répertoire partagé
+(``DASHBOARD_SHARED_DIR``, idéalement sur ``/dev/shm``). Les processus du tableau
+de bord et de l'API les ouvrent en memory-map, en lecture seule : les pages sont
+partagées par le noyau, chaque processus supplémentaire n'ajoute que sa mémoire
+propre (interpréteur, bibliothèques, index de ``data``).
+
+Des fichiers plutôt que ``multiprocessing.shared_memory`` : les segments
+survivent à l'arrêt du chargeur et une nouvelle publication remplace
+atomiquement le répertoire, sans invalider les projections des processus en cours.
+
+``data`` et ``sample`` eux-mêmes sont déjà partagés de la même façon par le
+stockage colonnaire (Feather en memory-map, voir ``core.datastore``).
+'''
+import json
+import os
+import shutil
+
+import numpy as np
+
+from core import config
+
+
+MANIFEST = 'manifest.json'
+
+#Tableaux publiés : nom du fichier -> (objet, attribut) dans le chargeur
+ARRAYS = {
+    'sample_ids': ('index', 'ids'),
+    'sample_matrix': ('index', 'matrix'),
+    'sample_sorted_ids': ('positions', 'sorted_ids'),
+    'sample_order': ('positions', 'order'),
+    'score_proba': ('scores', 'proba'),
+    'score_bands': ('scores', 'bands'),
+    'neighbors_matrix': ('neighbors', 'matrix'),
+    'neighbors_norms': ('neighbors', 'norms'),
+    'neighbors_mean': ('neighbors', 'mean'),
+    'neighbors_scale': ('neighbors', 'scale'),
+}
+
+
+def publish(index, scores, neighbors, version, directory=None):
+    '''Écriture des tableaux partagés ; remplace atomiquement une publication précédente'''
+    directory = os.path.abspath(directory or config.SHARED_DIR)
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    objects = {'index': index, 'positions': index.positions, 'scores': scores, 'neighbors': neighbors}
+    for name, (obj, attr) in ARRAYS.items():
+        np.save(os.path.join(tmp, name + '.npy'), np.ascontiguousarray(getattr(objects[obj], attr)))
+    manifest = {'version': version, 'score_key': scores.key, 'neighbors_key': neighbors.key,
+                'columns': [str(c) for c in index.columns]}
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    #Les processus qui ont projeté l'ancienne version la gardent jusqu'à leur prochain rechargement
+    old = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+class SharedData:
+    '''Tableaux publiés, ouverts en memory-map (lecture seule)'''
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.SHARED_DIR
+        with open(os.path.join(self.directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.arrays = {name: np.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+                       for name in ARRAYS}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+
+def signature(directory=None):
+    '''Date de modification du manifeste (None si rien n'est publié) : change à chaque publication'''
+    try:
+        return os.stat(os.path.join(directory or config.SHARED_DIR, MANIFEST)).st_mtime_ns
+    except FileNotFoundError:
+        return None
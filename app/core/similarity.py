@@ -0,0 +1,98 @@
+'''Recherche des dossiers clients les plus similaires.
+
+Les variables de ``X_sample`` (sans TARGET) sont standardisées une seule fois et
+rangées dans une matrice float32. Les k plus proches voisins d'un client sont
+obtenus par un calcul vectorisé, par blocs, des distances euclidiennes
+(||x||² - 2 x.q + ||q||²) : la recherche prend quelques millisecondes, sans
+ré-entraînement. L'index est enregistré à côté du modèle.
+'''
+import os
+
+import numpy as np
+
+from core import config
+from core.client_index import positions_for
+
+
+class NeighborIndex:
+    '''Index de plus proches voisins sur les variables standardisées'''
+
+    def __init__(self, ids, matrix, mean, scale, key, norms=None, index=None):
+        self.ids = ids
+        self.matrix = matrix
+        self.mean = mean
+        self.scale = scale
+        self.key = key
+        self.norms = np.einsum('ij,ij->i', matrix, matrix) if norms is None else norms
+        self.positions = positions_for(ids, index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return int(id) in self.positions
+
+    @classmethod
+    def build(cls, index, key):
+        '''Construction depuis le ClientIndex de sample (TARGET en dernière colonne)'''
+        X = index.matrix[:, :-1]
+        mean = np.nanmean(X, axis=0)
+        scale = np.nanstd(X, axis=0)
+        scale[~(scale > 0)] = 1.0
+        mean = np.nan_to_num(mean)
+        return cls(index.ids, cls._standardize(X, mean, scale), mean, scale, key, index=index)
+
+    @staticmethod
+    def _standardize(X, mean, scale):
+        #Valeurs manquantes imputées par la moyenne (0 après standardisation)
+        Z = ((X - mean) / scale).astype(np.float32)
+        np.nan_to_num(Z, copy=False)
+        return Z
+
+    def _nearest(self, q, k, exclude=None, chunk_size=200_000):
+        distances = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), chunk_size):
+            stop = start + chunk_size
+            distances[start:stop] = self.norms[start:stop] - 2 * (self.matrix[start:stop] @ q)
+        distances += q @ q
+        if exclude is not None:
+            distances[exclude] = np.inf
+        k = min(k, len(distances) - (exclude is not None))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return self.ids[nearest], np.sqrt(np.maximum(distances[nearest], 0))
+
+    def query(self, id, k=10):
+        '''(identifiants, distances) des k dossiers les plus proches d'un client'''
+        pos = self.positions[int(id)]
+        return self._nearest(self.matrix[pos], k, exclude=pos)
+
+    def query_vector(self, x, k=10):
+        '''(identifiants, distances) des k dossiers les plus proches d'un vecteur de variables'''
+        q = self._standardize(np.asarray(x, dtype=np.float64).reshape(1, -1), self.mean, self.scale)[0]
+        return self._nearest(q, k)
+
+    def save(self, path=None):
+        path = path or config.NEIGHBORS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, ids=self.ids, matrix=self.matrix, mean=self.mean, scale=self.scale,
+                 key=np.array(self.key))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None, index=None):
+        with np.load(path or config.NEIGHBORS_PATH) as f:
+            return cls(f['ids'], f['matrix'], f['mean'], f['scale'], str(f['key']), index=index)
+
+
+def load_neighbor_index(index, key, path=None):
+    '''Index enregistré si sa clé (version des données) est à jour, sinon reconstruction'''
+    path = path or config.NEIGHBORS_PATH
+    if os.path.exists(path):
+        neighbors = NeighborIndex.load(path, index)
+        if neighbors.key == key:
+            return neighbors
+    neighbors = NeighborIndex.build(index, key)
+    neighbors.save(path)
+    return neighbors
@@ -0,0 +1,128 @@
+'''Statistiques de population précalculées par version du jeu de données.
+
+Les agrégats du portefeuille (nombre de prêts, moyennes, effectifs par classe de
+TARGET) et les histogrammes des âges et des revenus (bornes et effectifs) sont
+calculés une seule fois et enregistrés dans un petit fichier JSON. Les graphiques
+sont tracés à partir des effectifs, sans relire les données brutes.
+
+Le nuage de points Âge / Revenu est quant à lui alimenté par un échantillon
+stratifié du portefeuille, de taille bornée.
+'''
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import config
+
+
+#Nombre de classes des histogrammes affichés
+AGE_BINS = 20
+INCOME_BINS = 10
+#Les revenus au-delà de ce plafond ne sont pas représentés (valeurs extrêmes)
+INCOME_LIMIT = 200000
+
+#Colonnes du nuage de points Âge / Revenu (axes, couleur et infobulles)
+SCATTER_COLUMNS = ['DAYS_BIRTH', 'AMT_INCOME_TOTAL', 'CODE_GENDER',
+                   'NAME_FAMILY_STATUS', 'CNT_CHILDREN', 'NAME_CONTRACT_TYPE']
+
+
+def histogram(values, bins):
+    '''(bornes, effectifs) d'une série, valeurs manquantes ignorées'''
+    values = np.asarray(values, dtype=np.float64)
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+    return edges, counts
+
+
+class PopulationStats:
+    '''Agrégats et histogrammes du portefeuille pour une version des données'''
+
+    def __init__(self, version, nb_credits, rev_moy, credits_moy, targets, age_hist, income_hist):
+        self.version = version
+        self.nb_credits = nb_credits
+        self.rev_moy = rev_moy
+        self.credits_moy = credits_moy
+        #effectifs par classe de TARGET : [solvables, non solvables]
+        self.targets = targets
+        self.age_hist = age_hist
+        self.income_hist = income_hist
+
+    @classmethod
+    def compute(cls, data, version):
+        targets = data['TARGET'].value_counts().reindex([0, 1], fill_value=0)
+        income = data['AMT_INCOME_TOTAL'].to_numpy(dtype=np.float64)
+        return cls(version,
+                   int(data.shape[0]),
+                   round(float(data['AMT_INCOME_TOTAL'].mean()), 2),
+                   round(float(data['AMT_CREDIT'].mean()), 2),
+                   [int(n) for n in targets],
+                   histogram(np.round(data['DAYS_BIRTH'].to_numpy(dtype=np.float64) / 365, 2), AGE_BINS),
+                   histogram(income[income < INCOME_LIMIT], INCOME_BINS))
+
+    def to_dict(self):
+        return {'version': self.version, 'nb_credits': self.nb_credits, 'rev_moy': self.rev_moy,
+                'credits_moy': self.credits_moy, 'targets': self.targets,
+                'age_hist': [a.tolist() for a in self.age_hist],
+                'income_hist': [a.tolist() for a in self.income_hist]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['version'], d['nb_credits'], d['rev_moy'], d['credits_moy'], d['targets'],
+                   tuple(np.array(a) for a in d['age_hist']),
+                   tuple(np.array(a) for a in d['income_hist']))
+
+    def save(self, path=None):
+        path = path or config.STATS_PATH
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=None):
+        with open(path or config.STATS_PATH) as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_population_stats(data, version, path=None):
+    '''Statistiques enregistrées si elles correspondent à la version, sinon recalcul'''
+    path = path or config.STATS_PATH
+    if os.path.exists(path):
+        stats = PopulationStats.load(path)
+        if stats.version == version:
+            return stats
+    stats = PopulationStats.compute(data, version)
+    stats.save(path)
+    return stats
+
+
+def scatter_frame(frame):
+    '''Lignes prêtes pour le nuage de points (SK_ID_CURR en colonne, âge en années)'''
+    points = frame[SCATTER_COLUMNS].reset_index()
+    points['DAYS_BIRTH'] = (points['DAYS_BIRTH'] / 365).round(1)
+    return points
+
+
+def scatter_points(data, budget, seed=0):
+    '''Échantillon du nuage Âge / Revenu, stratifié par CODE_GENDER.
+
+    Chaque genre garde sa part du portefeuille ; au plus ``budget`` points (à
+    l'arrondi près) sont envoyés au navigateur, quelle que soit la taille des données.
+    '''
+    if len(data) <= budget:
+        return scatter_frame(data)
+    rng = np.random.default_rng(seed)
+    positions = []
+    for group in data.groupby('CODE_GENDER', observed=True, dropna=False).indices.values():
+        n = min(len(group), max(1, round(budget * len(group) / len(data))))
+        positions.append(rng.choice(group, size=n, replace=False))
+    return scatter_frame(data.iloc[np.sort(np.concatenate(positions))])
+
+
+def with_client(points, record):
+    '''Nuage de points complété par le dossier du client s'il n'y figure pas'''
+    if points['SK_ID_CURR'].eq(record.index[0]).any():
+        return points
+    return pd.concat([points, scatter_frame(record)], ignore_index=True)
@@ -0,0 +1,123 @@
+'''Scoring en flux de gros fichiers de demandes de crédit.
+
+Le fichier (CSV ou CSV zippé) est lu par morceaux ; chaque morceau est aligné sur
+les variables du modèle puis scoré dans un pool de processus. Les résultats sont
+écrits au fur et à mesure (Parquet ou CSV), dans l'ordre du fichier. Le nombre de
+morceaux en cours est borné : la mémoire ne dépend pas de la taille du fichier.
+'''
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core import model_registry, scoring
+from core.datastore import INDEX_COL
+
+
+_worker_registry = None
+
+
+def _init_worker(model_path, model_format):
+    global _worker_registry
+    _worker_registry = model_registry.registry_for(model_path, model_format)
+    _worker_registry.get()
+
+
+def _score_chunk(X):
+    return _worker_registry.get().predict_proba(X)[:, 1]
+
+
+def align_chunk(chunk, features):
+    '''Matrice des variables du modèle : colonnes absentes manquantes, valeurs non numériques en NaN'''
+    aligned = chunk.reindex(columns=features)
+    for name, col in aligned.items():
+        if not pd.api.types.is_numeric_dtype(col.dtype):
+            aligned[name] = pd.to_numeric(col, errors='coerce')
+    return aligned.to_numpy(dtype=np.float64)
+
+
+class ResultWriter:
+    '''Écriture incrémentale des scores, en Parquet (.parquet) ou en CSV'''
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._header = True
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _results(ids, proba):
+    bands = scoring.risk_band(proba)
+    labels = np.array([label for _, label, _ in scoring.RISK_BANDS], dtype=object)
+    return pd.DataFrame({INDEX_COL: ids, 'probability': proba, 'risk_band': labels[bands],
+                         'solvable': np.round(proba * 100) < scoring.DECISION_THRESHOLD})
+
+
+def peak_rss_mb():
+    '''Pic de mémoire résidente (Mo) du processus principal et des workers (Linux : ko)'''
+    parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return parent / 1024, children / 1024
+
+
+def score_file(input_path, output_path, features, model_path=None, model_format=None,
+               chunk_size=50_000, workers=None, progress=None):
+    '''Scoring en flux de input_path vers output_path ; renvoie les statistiques d'exécution'''
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    n_rows = n_chunks = 0
+    writer = ResultWriter(output_path)
+    #Au plus deux morceaux en attente par worker
+    pending = deque()
+
+    def flush_one():
+        nonlocal n_rows, n_chunks
+        ids, future = pending.popleft()
+        writer.write(_results(ids, future.result()))
+        n_rows += len(ids)
+        n_chunks += 1
+        if progress is not None:
+            progress(n_chunks, n_rows, time.perf_counter() - start)
+
+    reader = pd.read_csv(input_path, chunksize=chunk_size, encoding='utf-8')
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(model_path, model_format)) as pool:
+        try:
+            for chunk in reader:
+                if INDEX_COL not in chunk.columns:
+                    raise ValueError(f"Colonne {INDEX_COL} absente de {input_path}")
+                ids = chunk[INDEX_COL].to_numpy()
+                pending.append((ids, pool.submit(_score_chunk, align_chunk(chunk, features))))
+                if len(pending) >= 2 * workers:
+                    flush_one()
+            while pending:
+                flush_one()
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    parent_mb, workers_mb = peak_rss_mb()
+    return {'modèle': model_registry.registry_for(model_path, model_format).source_path(),
+            'lignes': n_rows, 'morceaux': n_chunks, 'durée (s)': elapsed,
+            'lignes/s': n_rows / elapsed if elapsed else 0.0,
+            'pic RSS principal (Mo)': parent_mb, 'pic RSS worker (Mo)': workers_mb}
@@ -0,0 +1,87 @@
+'''Analyse du seuil de décision sur tout le portefeuille.
+
+Les scores du portefeuille (table des scores) sont triés une fois ; les sommes
+cumulées de TARGET, de AMT_CREDIT et des pertes le long de cet ordre donnent,
+pour n'importe quel seuil, les clients acceptés (les k premiers) et toutes les
+métriques en O(log n) : une recherche dichotomique, puis quelques lectures.
+
+Comme pour la décision affichée au client, un dossier est accepté si sa
+probabilité arrondie au pourcent est inférieure au seuil (en %).
+'''
+import numpy as np
+import pandas as pd
+
+
+#Colonnes de data proposées pour la décomposition par segment
+SEGMENTS = ['CODE_GENDER', 'NAME_CONTRACT_TYPE']
+
+
+def _cumsum(values):
+    '''Sommes cumulées précédées de 0 : la somme des k premiers vaut cumsum[k]'''
+    return np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+
+
+class ThresholdAnalysis:
+    '''Métriques de décision pour tous les seuils, à partir des scores triés'''
+
+    def __init__(self, proba, target, credit):
+        order = np.argsort(proba, kind='stable')
+        proba = np.asarray(proba, dtype=np.float64)[order]
+        target = np.nan_to_num(np.asarray(target, dtype=np.float64)[order])
+        credit = np.nan_to_num(np.asarray(credit, dtype=np.float64)[order])
+        self.n = len(proba)
+        #Probabilités triées arrondies au pourcent (l'arrondi conserve l'ordre)
+        self.percent = np.round(proba * 100)
+        self.cum_proba = _cumsum(proba)
+        self.cum_target = _cumsum(target)
+        self.cum_credit = _cumsum(credit)
+        #Pertes observées (défauts) et attendues (probabilité), pondérées par AMT_CREDIT
+        self.cum_loss = _cumsum(target * credit)
+        self.cum_expected_loss = _cumsum(proba * credit)
+
+    def __len__(self):
+        return self.n
+
+    def accepted(self, threshold):
+        '''Nombre de dossiers acceptés au(x) seuil(s) (en %)'''
+        return np.searchsorted(self.percent, threshold, side='left')
+
+    def metrics(self, threshold):
+        '''Métriques au(x) seuil(s) (en %) : dictionnaire de scalaires, ou de tableaux si
+        ``threshold`` est un tableau'''
+        k = self.accepted(threshold)
+        n = max(self.n, 1)
+        total_defaults = self.cum_target[-1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'seuil (%)': threshold,
+                'acceptés': k,
+                "taux d'acceptation": k / n,
+                'taux de défaut observé': self.cum_target[k] / k,
+                'taux de défaut attendu': self.cum_proba[k] / k,
+                'perte observée': self.cum_loss[k],
+                'perte attendue': self.cum_expected_loss[k],
+                'taux de perte attendu': self.cum_expected_loss[k] / self.cum_credit[k],
+                'défauts écartés': (total_defaults - self.cum_target[k]) / total_defaults if total_defaults else np.nan,
+            }
+
+    def curves(self, thresholds):
+        '''Métriques pour une série de seuils, une ligne par seuil'''
+        return pd.DataFrame(self.metrics(np.asarray(thresholds, dtype=np.float64)))
+
+
+def segment_analyses(proba, target, credit, labels):
+    '''Une analyse par valeur de ``labels`` (valeurs manquantes regroupées)'''
+    labels = pd.Series(labels).astype(object).fillna('(manquant)').to_numpy()
+    proba, target, credit = (np.asarray(a) for a in (proba, target, credit))
+    analyses = {}
+    for label in sorted(set(labels), key=str):
+        mask = labels == label
+        analyses[label] = ThresholdAnalysis(proba[mask], target[mask], credit[mask])
+    return analyses
+
+
+def segment_metrics(analyses, threshold):
+    '''Métriques au seuil de chaque segment, une ligne par segment'''
+    rows = [{'segment': label, 'dossiers': len(a), **a.metrics(threshold)} for label, a in analyses.items()]
+    return pd.DataFrame(rows)
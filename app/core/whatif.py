@@ -0,0 +1,69 @@
+'''Simulation "what-if" : probabilité de défaut d'un client si deux variables changeaient.
+
+La ligne du client est recopiée sur une grille de valeurs de deux variables
+(par défaut 50 x 50) ; toutes les copies sont scorées en un seul appel
+vectorisé à ``predict_proba``, au lieu d'une prédiction par mouvement de
+curseur. Les valeurs de chaque variable vont du 1er au 99e centile du
+portefeuille, valeur du client incluse.
+'''
+import numpy as np
+
+
+#Variables proposées par défaut, si elles font partie des variables du modèle
+DEFAULT_FEATURES = ['AMT_CREDIT', 'AMT_ANNUITY', 'AMT_GOODS_PRICE']
+
+GRID_STEPS = 50
+
+#Centiles bornant les valeurs simulées
+QUANTILES = (0.01, 0.99)
+
+
+def feature_range(values, quantiles=QUANTILES):
+    '''(minimum, maximum) des valeurs simulées d'une variable (valeurs manquantes ignorées)'''
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.nan, np.nan
+    low, high = np.quantile(values, quantiles)
+    return float(low), float(high)
+
+
+def axis_values(low, high, value=np.nan, steps=GRID_STEPS):
+    '''Valeurs d'un axe de la grille : ``steps`` valeurs de low à high, étendues à la valeur du client'''
+    if not np.isnan(value):
+        low = value if np.isnan(low) else min(low, value)
+        high = value if np.isnan(high) else max(high, value)
+    if np.isnan(low) or low == high:
+        #Variable constante (ou toujours manquante) dans le portefeuille
+        return np.array([low])
+    return np.linspace(low, high, steps)
+
+
+def simulate(model, row, i, j, x, y):
+    '''Probabilités de défaut (len(y), len(x)) du client quand les variables i et j valent x et y'''
+    X = np.repeat(np.asarray(row, dtype=np.float64).reshape(1, -1), len(x) * len(y), axis=0)
+    X[:, i] = np.tile(x, len(y))
+    X[:, j] = np.repeat(y, len(x))
+    return model.predict_proba(X)[:, 1].reshape(len(y), len(x))
+
+
+class WhatIfGrid:
+    '''Grille simulée d'un client pour un couple de variables'''
+
+    def __init__(self, x_feature, y_feature, x, y, proba, client):
+        self.x_feature = x_feature
+        self.y_feature = y_feature
+        self.x = x
+        self.y = y
+        self.proba = proba
+        #Valeurs réelles du client (x, y)
+        self.client = client
+
+    @classmethod
+    def build(cls, model, row, features, x_feature, y_feature, x_range, y_range, steps=GRID_STEPS):
+        '''``features`` : variables du modèle dans l'ordre de ``row`` ; ``x_range``/``y_range`` : (min, max)'''
+        i, j = features.index(x_feature), features.index(y_feature)
+        x = axis_values(*x_range, row[i], steps)
+        y = axis_values(*y_range, row[j], steps)
+        return cls(x_feature, y_feature, x, y, simulate(model, row, i, j, x, y),
+                   (float(row[i]), float(row[j])))
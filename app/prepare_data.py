@@ -0,0 +1,168 @@
+'''Préparation hors ligne des données du tableau de bord.
+
+Usage (depuis la racine du dépôt) :
+
+    python app/prepare_data.py convert    # archives CSV -> stockage colonnaire
+    python app/prepare_data.py score      # table des scores du portefeuille
+    python app/prepare_data.py explain    # contributions des variables par client
+    python app/prepare_data.py neighbors  # index des dossiers similaires
+    python app/prepare_data.py segment    # segmentation des clients (par morceaux)
+    python app/prepare_data.py stats      # statistiques de population
+    python app/prepare_data.py export-model  # booster LightGBM natif
+    python app/prepare_data.py publish    # tableaux partagés du déploiement multi-processus
+'''
+import argparse
+import pickle
+
+from core import compaction, config, datastore, explain, model_registry, scoring, segmentation, similarity, stats
+from core.client_index import ClientIndex
+
+
+MODEL_HELP = "pickle sklearn à utiliser (défaut : modèle courant, natif si exporté)"
+
+
+def cmd_convert(args):
+    manifest, reports = datastore.convert_archives(args.data_dir, args.store_dir)
+    for name, infos in manifest['sources'].items():
+        print(f"{name}: {infos['rows']} lignes, {infos['columns']} colonnes")
+        if reports[name] is not None:
+            if args.report:
+                print(reports[name].to_string(index=False))
+            before, after, ratio = compaction.summary(reports[name])
+            print(f"  mémoire : {before / 2**20:.1f} Mo -> {after / 2**20:.1f} Mo (x{ratio:.1f})")
+    print(f"Version du jeu de données : {manifest['version']}")
+
+
+def cmd_score(args):
+    _, sample = datastore.load_frames()
+    registry = model_registry.ModelRegistry(path=args.model, model_format='pickle' if args.model else None)
+    clf = registry.get()
+    key = scoring.table_key(registry.sha, datastore.dataset_version())
+    table = scoring.load_score_table(clf, ClientIndex(sample), key, args.output, args.chunk_size)
+    print(f"{len(table)} clients scorés (clé {table.key}) -> {args.output or config.SCORES_PATH}")
+
+
+def cmd_explain(args):
+    _, sample = datastore.load_frames()
+    registry = model_registry.ModelRegistry(path=args.model, model_format='pickle' if args.model else None)
+    clf = registry.get()
+    key = scoring.table_key(registry.sha, datastore.dataset_version())
+    table = explain.ExplanationTable.build(clf, ClientIndex(sample), key, args.limit, args.chunk_size)
+    table.save(args.output)
+    print(f"Contributions de {len(table)} clients ({table.values.nbytes / 2**20:.1f} Mo, clé {table.key}) "
+          f"-> {args.output or config.EXPLANATIONS_PATH}")
+
+
+def cmd_neighbors(args):
+    _, sample = datastore.load_frames()
+    neighbors = similarity.load_neighbor_index(ClientIndex(sample), datastore.dataset_version(), args.output)
+    print(f"Index de {len(neighbors)} clients (clé {neighbors.key}) -> {args.output or config.NEIGHBORS_PATH}")
+
+
+def cmd_segment(args):
+    version = datastore.dataset_version()
+    def chunks():
+        return segmentation.sample_chunks(args.chunk_size)
+
+    if args.update is None:
+        model = segmentation.SegmentationModel(args.clusters).fit(chunks, args.epochs)
+        ids, labels = model.label(chunks())
+        table = segmentation.SegmentTable(ids, labels, model.centroids, version)
+    else:
+        #Refit partiel : centroïdes mis à jour avec les nouvelles demandes, puis nouveaux segments
+        table = segmentation.load_segment_table(version, args.output)
+        if table is None:
+            raise SystemExit("Aucune segmentation à jour : lancer d'abord python app/prepare_data.py segment")
+        model = segmentation.SegmentationModel.load(args.model_output)
+        features = [col for col in datastore.source_columns('sample') if col != segmentation.TARGET]
+        for _, X in segmentation.file_chunks(args.update, features, args.chunk_size):
+            model.partial_fit(X)
+        new_ids, new_labels = model.label(segmentation.file_chunks(args.update, features, args.chunk_size))
+        ids, labels = model.label(chunks())
+        table = table.update(ids, labels, model.centroids).update(new_ids, new_labels, model.centroids)
+    model.save(args.model_output)
+    table.save(args.output)
+    counts = ", ".join(str(n) for n in table.counts())
+    print(f"{len(table)} clients en {len(table.centroids)} segments ({counts}) -> {args.output or config.SEGMENTS_PATH}")
+
+
+def cmd_stats(args):
+    data, _ = datastore.load_frames()
+    population = stats.load_population_stats(data, datastore.dataset_version(), args.output)
+    print(f"Statistiques de {population.nb_credits} prêts (version {population.version}) "
+          f"-> {args.output or config.STATS_PATH}")
+
+
+def cmd_export_model(args):
+    with open(args.model, 'rb') as f:
+        clf = pickle.load(f)
+    print(f"Booster natif -> {model_registry.export_native(clf, args.output)}")
+
+
+def cmd_publish(args):
+    if args.shared_dir:
+        config.SHARED_DIR = args.shared_dir
+    if not config.SHARED_DIR:
+        raise SystemExit("Répertoire partagé non défini (--shared-dir ou DASHBOARD_SHARED_DIR)")
+    from core import service
+    manifest = service.publish()
+    print(f"Tableaux partagés (version {manifest['version']}, scores {manifest['score_key']}) "
+          f"-> {config.SHARED_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="conversion des archives CSV en stockage colonnaire")
+    convert.add_argument('--data-dir', default=None)
+    convert.add_argument('--store-dir', default=None)
+    convert.add_argument('--report', action='store_true', help="rapport mémoire par colonne")
+    convert.set_defaults(func=cmd_convert)
+
+    score = subparsers.add_parser('score', help="scoring de tout l'échantillon par lots")
+    score.add_argument('--model', default=None, help=MODEL_HELP)
+    score.add_argument('--output', default=None)
+    score.add_argument('--chunk-size', type=int, default=50_000)
+    score.set_defaults(func=cmd_score)
+
+    contrib = subparsers.add_parser('explain', help="contributions des variables (SHAP) de l'échantillon")
+    contrib.add_argument('--model', default=None, help=MODEL_HELP)
+    contrib.add_argument('--output', default=None)
+    contrib.add_argument('--limit', type=int, default=None, help="nombre maximal de clients précalculés")
+    contrib.add_argument('--chunk-size', type=int, default=10_000)
+    contrib.set_defaults(func=cmd_explain)
+
+    neighbors = subparsers.add_parser('neighbors', help="index des dossiers similaires")
+    neighbors.add_argument('--output', default=None)
+    neighbors.set_defaults(func=cmd_neighbors)
+
+    segment = subparsers.add_parser('segment', help="segmentation des clients, entraînée par morceaux")
+    segment.add_argument('--clusters', type=int, default=segmentation.N_CLUSTERS)
+    segment.add_argument('--epochs', type=int, default=1, help="passages sur les données")
+    segment.add_argument('--chunk-size', type=int, default=50_000)
+    segment.add_argument('--update', default=None, metavar='FICHIER',
+                         help="nouvelles demandes (CSV) : mise à jour partielle au lieu d'un entraînement complet")
+    segment.add_argument('--output', default=None)
+    segment.add_argument('--model-output', default=None)
+    segment.set_defaults(func=cmd_segment)
+
+    population = subparsers.add_parser('stats', help="statistiques de population (agrégats, histogrammes)")
+    population.add_argument('--output', default=None)
+    population.set_defaults(func=cmd_stats)
+
+    export = subparsers.add_parser('export-model', help="export du booster LightGBM au format natif")
+    export.add_argument('--model', default=config.MODEL_PATH)
+    export.add_argument('--output', default=None)
+    export.set_defaults(func=cmd_export_model)
+
+    publish = subparsers.add_parser('publish', help="publication des tableaux partagés entre workers")
+    publish.add_argument('--shared-dir', default=None)
+    publish.set_defaults(func=cmd_publish)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
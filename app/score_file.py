@@ -0,0 +1,49 @@
+'''Scoring en flux d'un fichier de demandes (format application_test.csv).
+
+Usage (depuis la racine du dépôt) :
+
+    python app/score_file.py data/application_test.zip --output scores.parquet
+
+Le fichier (CSV ou CSV zippé) est lu par morceaux, aligné sur les variables du
+modèle et scoré sur tous les cœurs ; les résultats sont écrits au fur et à mesure
+en Parquet (.parquet) ou en CSV.
+'''
+import argparse
+import sys
+
+from core import datastore, streaming
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="fichier CSV ou CSV zippé, avec une colonne SK_ID_CURR")
+    parser.add_argument('--output', required=True, help="fichier de sortie (.parquet ou .csv)")
+    parser.add_argument('--model', default=None,
+                        help="pickle sklearn à utiliser (défaut : modèle courant, natif si exporté)")
+    parser.add_argument('--model-format', default=None, help="auto, native ou pickle")
+    parser.add_argument('--features', default=None,
+                        help="fichier listant les variables du modèle (une par ligne) ; "
+                             "par défaut les colonnes de X_sample")
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, default=None, help="nombre de processus (défaut : tous les cœurs)")
+    args = parser.parse_args()
+
+    if args.features:
+        with open(args.features) as f:
+            features = [line.strip() for line in f if line.strip()]
+    else:
+        features = [col for col in datastore.source_columns('sample') if col != 'TARGET']
+
+    def progress(n_chunks, n_rows, elapsed):
+        print(f"\r{n_chunks} morceaux, {n_rows} lignes, {n_rows / elapsed:.0f} lignes/s",
+              end='', file=sys.stderr, flush=True)
+
+    result = streaming.score_file(args.input, args.output, features, args.model, args.model_format,
+                                  args.chunk_size, args.workers, progress)
+    print(file=sys.stderr)
+    for key, value in result.items():
+        print(f"{key} : {value:.1f}" if isinstance(value, float) else f"{key} : {value}")
+
+
+if __name__ == '__main__':
+    main()
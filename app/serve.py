@@ -0,0 +1,68 @@
+'''Déploiement multi-processus : un chargeur, N workers partageant les données.
+
+Le chargeur (ce processus) calcule une fois la matrice des variables, la table
+des scores et l'index des dossiers similaires, et les publie dans le répertoire
+partagé (voir core.shared). Les workers les ouvrent ensuite en memory-map :
+la mémoire totale n'augmente que de la mémoire propre de chaque worker.
+
+Usage (depuis la racine du dépôt) :
+
+    python app/serve.py api --workers 4 --port 8000
+    python app/serve.py dashboard --workers 4 --port 8501   # ports 8501 à 8504
+'''
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker_commands(target, workers, port):
+    if target == 'api':
+        #Un seul maître uvicorn et ses workers, sur le même port
+        return [[sys.executable, '-m', 'uvicorn', 'api:app', '--app-dir', APP_DIR,
+                 '--host', '0.0.0.0', '--port', str(port), '--workers', str(workers)]]
+    #Un serveur Streamlit par worker (derrière un répartiteur de charge)
+    return [[sys.executable, '-m', 'streamlit', 'run', os.path.join(APP_DIR, 'app.py'),
+             '--server.port', str(port + i), '--server.headless', 'true']
+            for i in range(workers)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', choices=['api', 'dashboard'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--port', type=int, default=None, help="8000 (api) ou 8501 (dashboard)")
+    parser.add_argument('--shared-dir', default=None,
+                        help="répertoire partagé (défaut : DASHBOARD_SHARED_DIR, sinon /dev/shm/credit-scoring)")
+    args = parser.parse_args()
+
+    shared_dir = args.shared_dir or os.environ.get('DASHBOARD_SHARED_DIR') or '/dev/shm/credit-scoring'
+    #Lu par core.config, dans ce processus comme dans les workers
+    os.environ['DASHBOARD_SHARED_DIR'] = shared_dir
+    from core import config, service
+
+    manifest = service.publish()
+    print(f"Tableaux partagés publiés (version {manifest['version']}) -> {shared_dir}", flush=True)
+
+    port = args.port or (8000 if args.target == 'api' else 8501)
+    processes = []
+    for i, cmd in enumerate(worker_commands(args.target, args.workers, port)):
+        env = dict(os.environ)
+        #Un serveur de métriques par processus Streamlit (ports consécutifs)
+        if args.target == 'dashboard' and config.METRICS_PORT:
+            env['DASHBOARD_METRICS_PORT'] = str(config.METRICS_PORT + i)
+        processes.append(subprocess.Popen(cmd, env=env))
+    try:
+        for proc in processes:
+            proc.wait()
+    except KeyboardInterrupt:
+        for proc in processes:
+            proc.terminate()
+        for proc in processes:
+            proc.wait()
+
+
+if __name__ == '__main__':
+    main()
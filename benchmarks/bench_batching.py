@@ -0,0 +1,78 @@
+'''Test de charge : scoring ligne à ligne direct vs file de micro-batching.
+
+N clients concurrents (threads) envoient chacun des demandes de scoring d'une
+ligne pendant une durée fixe. On mesure la latence (p50, p99) et le débit.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/bench_batching.py --clients 1 8 32 --duration 5
+'''
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from core import batching, config, model_registry  # noqa: E402
+
+
+def run_load(score, n_clients, duration, rows):
+    latencies = [[] for _ in range(n_clients)]
+    stop = time.perf_counter() + duration
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < stop:
+            x = rows[rng.integers(len(rows))]
+            start = time.perf_counter()
+            score(x)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return {'requêtes': len(all_latencies),
+            'débit (req/s)': len(all_latencies) / duration,
+            'p50 (ms)': float(np.percentile(all_latencies, 50)),
+            'p99 (ms)': float(np.percentile(all_latencies, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None,
+                        help="pickle sklearn à utiliser (défaut : modèle courant, natif si exporté)")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=5.0, help="durée de chaque mesure (s)")
+    parser.add_argument('--max-batch-size', type=int, default=config.BATCH_MAX_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=config.BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    registry = model_registry.registry_for(args.model)
+    clf = registry.get()
+    print(f"Modèle : {registry.source}")
+    rows = np.random.default_rng(0).normal(size=(1000, clf.n_features_in_))
+
+    def direct(x):
+        return clf.predict_proba(x.reshape(1, -1))[0, 1]
+
+    batcher = batching.MicroBatcher(lambda X: clf.predict_proba(X)[:, 1],
+                                    args.max_batch_size, args.max_wait_ms)
+
+    print(f"{'mode':>8} {'clients':>8} {'requêtes':>9} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for n_clients in args.clients:
+        for name, score in [('direct', direct), ('batch', batcher.predict_one)]:
+            r = run_load(score, n_clients, args.duration, rows)
+            print(f"{name:>8} {n_clients:>8} {r['requêtes']:>9} {r['débit (req/s)']:>9.0f} "
+                  f"{r['p50 (ms)']:>9.2f} {r['p99 (ms)']:>9.2f}")
+    print(f"Micro-batching : {batcher.stats()}")
+
+
+if __name__ == '__main__':
+    main()
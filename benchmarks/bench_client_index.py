@@ -0,0 +1,77 @@
+'''Micro-benchmark : recherche d'un client par masque booléen vs ClientIndex.
+
+Mesure aussi la recherche par début d'identifiant (ClientIndex.search).
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/bench_client_index.py --rows 10000 300000 3000000
+'''
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from core.client_index import ClientIndex  # noqa: E402
+
+
+def make_frame(n_rows, n_columns, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(100002, 100002 + 3 * n_rows, 3)
+    frame = pd.DataFrame(rng.normal(size=(n_rows, n_columns)),
+                         columns=[f'F_{i}' for i in range(n_columns)],
+                         index=pd.Index(ids, name='SK_ID_CURR'))
+    return frame
+
+
+def bench(n_rows, n_columns, repeat):
+    frame = make_frame(n_rows, n_columns)
+    queries = np.random.default_rng(1).choice(frame.index.to_numpy(), size=repeat)
+
+    start = timeit.default_timer()
+    index = ClientIndex(frame)
+    build = timeit.default_timer() - start
+
+    def mask():
+        for id in queries:
+            frame[frame.index == int(id)]
+
+    def record():
+        for id in queries:
+            index.record(id)
+
+    def row():
+        for id in queries:
+            index.row(id)
+
+    def search():
+        for id in queries:
+            index.search(str(id)[:4])
+
+    result = {'rows': n_rows, 'build_s': build}
+    for name, func in [('mask', mask), ('index.record', record), ('index.row', row),
+                       ('index.search', search)]:
+        result[name + '_us'] = min(timeit.repeat(func, number=1, repeat=3)) / repeat * 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 300_000, 3_000_000])
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50, help="nombre de recherches par mesure")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'index (s)':>10} {'masque (us)':>12} {'record (us)':>12} {'row (us)':>10} {'search (us)':>12}")
+    for n_rows in args.rows:
+        r = bench(n_rows, args.columns, args.repeat)
+        print(f"{r['rows']:>10} {r['build_s']:>10.3f} {r['mask_us']:>12.1f} "
+              f"{r['index.record_us']:>12.1f} {r['index.row_us']:>10.2f} {r['index.search_us']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
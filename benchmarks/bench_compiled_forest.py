@@ -0,0 +1,109 @@
+'''Parité et débit du moteur compilé (core.forest) face au modèle LightGBM.
+
+Les lignes de test sont tirées autour des seuils de coupure du modèle (avec des
+valeurs nulles et manquantes) afin d'exercer les deux branches de chaque nœud.
+Le script échoue si l'écart de probabilité dépasse la tolérance.
+
+Avec ``--check`` (CI), seule la parité est vérifiée, sur de petits modèles
+entraînés avec une graine fixe sur des données synthétiques (valeurs manquantes
+traitées comme NaN, comme zéro, ou sans traitement spécifique) : aucun modèle
+ni aucune donnée du dépôt n'est nécessaire et le résultat est reproductible.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/bench_compiled_forest.py
+    python benchmarks/bench_compiled_forest.py --check
+'''
+import argparse
+import os
+import pickle
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from core import config  # noqa: E402
+from core.forest import CompiledForest, check_parity  # noqa: E402
+from core.model_registry import NativeModel  # noqa: E402
+
+
+def probe_rows(forest, n_rows, seed=0):
+    '''Lignes dont chaque variable prend la valeur d'un seuil du modèle, à peu près'''
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, forest.n_features_in_))
+    for j in range(forest.n_features_in_):
+        thresholds = forest.threshold[forest.feature == j]
+        if len(thresholds):
+            X[:, j] = rng.choice(thresholds, n_rows) + rng.choice([-1e-9, 0.0, 1e-9], n_rows)
+    X[rng.random(X.shape) < 0.05] = 0.0
+    X[rng.random(X.shape) < 0.10] = np.nan
+    return X
+
+
+def check_models(seed):
+    '''Petits modèles de référence, un par traitement des valeurs manquantes'''
+    from lightgbm import LGBMClassifier
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 20))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    models = {}
+    for name, params in [('NaN', {}), ('zéro', {'zero_as_missing': True}), ('aucun', {'use_missing': False})]:
+        clf = LGBMClassifier(n_estimators=50, num_leaves=15, random_state=seed, verbose=-1, **params)
+        models[name] = clf.fit(X, y)
+    return models
+
+
+def check(args):
+    '''Parité seule, reproductible : code de sortie non nul en cas d'écart'''
+    failed = False
+    for name, clf in check_models(args.seed).items():
+        forest = CompiledForest.from_model(clf)
+        gap = check_parity(clf, forest, probe_rows(forest, args.rows, args.seed))
+        failed |= gap > args.tolerance
+        print(f"manquants {name:>6} : écart maximal {gap:.2e} (tolérance {args.tolerance:.0e})")
+    if failed:
+        sys.exit("Écart de parité au-delà de la tolérance")
+
+
+def throughput(model, X, number):
+    '''Lignes scorées par seconde'''
+    seconds = min(timeit.repeat(lambda: model.predict_proba(X), number=number, repeat=3)) / number
+    return X.shape[0] / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=config.MODEL_PATH)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true',
+                        help="parité seule, sur des modèles de référence entraînés avec --seed (CI)")
+    args = parser.parse_args()
+    if args.check:
+        return check(args)
+
+    with open(args.model, 'rb') as f:
+        clf = pickle.load(f)
+    forest = CompiledForest.from_model(clf)
+    native = NativeModel(clf.booster_)
+
+    X = probe_rows(forest, args.rows, args.seed)
+    gap = check_parity(clf, forest, X)
+    print(f"Parité sur {args.rows} lignes : écart maximal {gap:.2e} (tolérance {args.tolerance:.0e})")
+
+    print(f"{'moteur':>10} {'1 ligne (lignes/s)':>20} {f'{args.rows} lignes (lignes/s)':>24}")
+    for name, model in [('sklearn', clf), ('natif', native), ('compilé', forest)]:
+        print(f"{name:>10} {throughput(model, X[:1], 200):>20.0f} {throughput(model, X, 1):>24.0f}")
+
+    if gap > args.tolerance:
+        sys.exit("Écart de parité au-delà de la tolérance")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+'''Benchmark de bout en bout du tableau de bord sur des données synthétiques.
+
+Pour chaque taille (``--rows``), un répertoire de travail est généré une fois
+(voir ``benchmarks/synthetic.py``) puis préparé avec ``app/prepare_data.py``
+(stockage colonnaire, scores, dossiers similaires ; ``--no-prepare`` mesure le
+chemin sans préparation, archives CSV et calculs au premier affichage).
+
+Deux processus neufs par taille :
+
+* "core" : chaque étape des chargeurs, à froid puis à chaud (médiane de
+  ``--repeat`` appels) : chargement des données, index clients, recherche d'un
+  client, score (table précalculée), contributions des variables, dossiers
+  similaires, histogrammes de population, nuage de points ;
+* "page" : la page elle-même, sans navigateur (AppTest) : premier rendu,
+  changement de client, ouverture de chaque section (dont la simulation
+  what-if) et rerun à chaud.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/bench_dashboard.py --rows 10000 100000 --json dashboard.json
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+APP_DIR = os.path.join(ROOT, 'app')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+
+#Exécuté dans le répertoire de travail (chemins relatifs de core.config)
+CORE = '''
+import json, statistics, sys, time
+repeat = int(sys.argv[1])
+timings = {}
+
+def stage(name, func, warm=True):
+    start = time.perf_counter()
+    result = func()
+    timings[name] = {"cold_s": time.perf_counter() - start}
+    if warm:
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - start)
+        timings[name]["warm_s"] = statistics.median(runs)
+    return result
+
+from core import config, service, stats
+data, sample, _, _ = stage("load_data", service.load_data, warm=False)
+index_data, index_sample = stage("client_index", service.load_client_index, warm=False)
+version = service.load_dataset_version()
+id = index_sample.ids[len(index_sample) // 2]
+stage("client_lookup", lambda: (index_data.record(id), index_sample.row(id)))
+stage("client_search", lambda: index_sample.search(str(id)[:4], config.SEARCH_LIMIT))
+scores = stage("load_scores", service.current_scores, warm=False)
+stage("prediction", lambda: scores.lookup(id))
+stage("contributions", lambda: service.client_contributions(id))
+neighbors = stage("load_neighbors", lambda: service.load_neighbors(version), warm=False)
+stage("similar_clients", lambda: neighbors.query(id, 10))
+stage("population_stats", lambda: stats.PopulationStats.compute(data, version))
+stage("scatter_points", lambda: stats.scatter_points(data, config.SCATTER_POINT_BUDGET))
+print(json.dumps(timings))
+'''
+
+PAGE = '''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+timings, errors = {}, []
+
+def step(name, action):
+    start = time.perf_counter()
+    action()
+    timings[name] = time.perf_counter() - start
+    errors.extend(str(e.value) for e in at.exception)
+
+def section(start):
+    return next(c for c in at.checkbox if c.label.startswith(start))
+
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+step("first_render", at.run)
+step("switch_client", lambda: at.sidebar.selectbox[0].select_index(1).run())
+step("open_infos", lambda: section("Afficher les informations").check().run())
+step("open_factors", lambda: section("Afficher les facteurs").check().run())
+step("open_whatif", lambda: section("Simuler").check().run())
+step("open_similar", lambda: section("Afficher les dossiers similaires").check().run())
+step("switch_client_all_open", lambda: at.sidebar.selectbox[0].select_index(2).run())
+step("warm_rerun", at.run)
+print(json.dumps({"page_s": timings, "exceptions": errors}))
+'''
+
+
+def prepare(workdir, rows, run_prepare):
+    if not os.path.exists(os.path.join(workdir, 'data', 'X_sample.zip')):
+        start = time.perf_counter()
+        synthetic.generate(workdir, rows)
+        print(f"données générées ({rows} lignes) en {time.perf_counter() - start:.1f} s", flush=True)
+    if run_prepare:
+        for command in ('convert', 'score', 'neighbors'):
+            subprocess.run([sys.executable, '-W', 'ignore', os.path.join(APP_DIR, 'prepare_data.py'), command],
+                           cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+
+
+def run_script(script, workdir, *args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.abspath(APP_DIR), env.get('PYTHONPATH')]))
+    proc = subprocess.run([sys.executable, '-W', 'ignore', '-c', script, *map(str, args)],
+                          cwd=workdir, capture_output=True, text=True, env=env)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--workdir', default='/tmp/credit-bench', help="un sous-répertoire par taille")
+    parser.add_argument('--no-prepare', dest='prepare', action='store_false',
+                        help="sans prepare_data.py (archives CSV, calculs au premier affichage)")
+    parser.add_argument('--repeat', type=int, default=20, help="appels à chaud par étape")
+    parser.add_argument('--json', help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        workdir = os.path.join(args.workdir, f"{rows}{'' if args.prepare else '-csv'}")
+        prepare(workdir, rows, args.prepare)
+        core = run_script(CORE, workdir, args.repeat)
+        page = run_script(PAGE, workdir, os.path.abspath(os.path.join(APP_DIR, 'app.py')))
+        results.append({'rows': rows, 'prepared': args.prepare, 'core': core, **page})
+
+        print(f"\n{rows} lignes ({'préparées' if args.prepare else 'CSV'})")
+        print(f"{'étape':>24} {'froid (ms)':>11} {'chaud (ms)':>11}")
+        for name, t in core.items():
+            warm = f"{t['warm_s'] * 1e3:>11.3f}" if 'warm_s' in t else f"{'-':>11}"
+            print(f"{name:>24} {t['cold_s'] * 1e3:>11.1f} {warm}")
+        print(f"{'page':>24} {'(ms)':>11}")
+        for name, seconds in page['page_s'].items():
+            print(f"{name:>24} {seconds * 1e3:>11.1f}")
+        if page['exceptions']:
+            print(f"exceptions : {page['exceptions']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu': os.cpu_count(), 'resultats': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
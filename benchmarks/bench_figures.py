@@ -0,0 +1,91 @@
+'''Micro-benchmark : histogramme redessiné avec pyplot à chaque rerun vs core.figures.
+
+"pyplot" reproduit l'ancien code (plt.subplots + sns.histplot + axvline, rendu
+PNG comme st.pyplot, figure jamais fermée) ; "cache" dessine la population une
+fois puis ne redessine que le marqueur du client. Pour chaque méthode : temps
+moyen d'un rendu, croissance de la mémoire résidente et figures pyplot ouvertes.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/bench_figures.py --renders 200
+'''
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from core import figures  # noqa: E402
+
+
+def rss_mb():
+    '''Mémoire résidente courante du processus (Linux)'''
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def population(seed=0):
+    ages = np.random.default_rng(seed).normal(43, 12, 300_000).clip(20, 70)
+    return np.histogram(ages, bins=20)
+
+
+def render_pyplot(edges, counts, x):
+    fig, ax = plt.subplots(figsize=(10, 5))
+    sns.histplot(x=edges[:-1], weights=counts, bins=edges.tolist(), edgecolor='k', color="skyblue")
+    ax.axvline(x, color="red", linestyle='--')
+    ax.set(title='Age du client', xlabel='Age(Années)', ylabel='')
+    buffer = io.BytesIO()
+    #Mêmes options que st.pyplot
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def bench(name, render, markers):
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    for x in markers:
+        render(x)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    return {'méthode': name, 'rendu_ms': elapsed / len(markers) * 1e3,
+            'croissance_rss_mo': rss_mb() - before, 'figures_pyplot': len(plt.get_fignums())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=200, help="nombre de reruns simulés")
+    args = parser.parse_args()
+
+    plt.style.use('fivethirtyeight')
+    sns.set_theme(style="darkgrid")
+    counts, edges = population()
+    markers = np.random.default_rng(1).uniform(20, 70, args.renders)
+
+    def draw(ax):
+        sns.histplot(x=edges[:-1], weights=counts, bins=edges.tolist(), edgecolor='k', color="skyblue", ax=ax)
+        ax.set(title='Age du client', xlabel='Age(Années)', ylabel='')
+
+    start = time.perf_counter()
+    cached = figures.MarkerFigure(draw, figsize=(10, 5), color="red", linestyle='--')
+    build = time.perf_counter() - start
+
+    results = [bench('cache', cached.render, markers),
+               bench('pyplot', lambda x: render_pyplot(edges, counts, x), markers)]
+    print(f"population dessinée une fois : {build * 1e3:.0f} ms")
+    print(f"{'méthode':>8} {'rendu (ms)':>11} {'RSS (Mo)':>9} {'figures':>8}")
+    for r in results:
+        print(f"{r['méthode']:>8} {r['rendu_ms']:>11.1f} {r['croissance_rss_mo']:>+9.1f} {r['figures_pyplot']:>8}")
+
+
+if __name__ == '__main__':
+    main()
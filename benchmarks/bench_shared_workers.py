@@ -0,0 +1,140 @@
+'''Benchmark : mémoire et débit de N workers, données privées vs partagées (core.shared).
+
+Chaque worker charge ce que charge un processus du tableau de bord ou de l'API
+(index clients, table des scores, index des dossiers similaires, modèle), puis
+traite des requêtes pendant ``--duration`` secondes (score, ligne du client,
+10 dossiers similaires). En mode "partagé", les tableaux sont publiés une fois
+par un chargeur et ouverts en memory-map par les workers.
+
+La mémoire est mesurée en PSS (Proportional Set Size : les pages partagées sont
+réparties entre les processus qui les utilisent), ce qui donne la mémoire
+totale réellement occupée par l'ensemble des workers.
+
+Usage (depuis la racine du dépôt, données préparées) :
+
+    python benchmarks/bench_shared_workers.py --workers 1 4 8 --json workers.json
+'''
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+
+
+def memory_mb(pid):
+    '''(PSS, RSS) d'un processus en Mo (Linux)'''
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Pss:', 'Rss:'):
+                values[parts[0]] = int(parts[1]) / 1024
+    return values['Pss:'], values['Rss:']
+
+
+def worker(shared_dir, ready, start, done, duration, results, seed):
+    #Avant tout import de core : core.config lit la variable au chargement
+    os.environ['DASHBOARD_SHARED_DIR'] = shared_dir
+    import numpy as np
+    from core import service
+
+    _, index_sample = service.load_client_index()
+    scores = service.current_scores()
+    neighbors = service.load_neighbors(service.load_dataset_version())
+    service.load_model()
+    ids = np.random.default_rng(seed).choice(index_sample.ids, size=10_000)
+    ready.put(os.getpid())
+    start.wait()
+
+    n = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        id = ids[n % len(ids)]
+        scores.lookup(id)
+        index_sample.row(id)
+        neighbors.query(id, 10)
+        n += 1
+    results.put(n)
+    #Mémoire mesurée après les requêtes (pages des tableaux effectivement lues)
+    done.wait()
+
+
+def collect(results, procs):
+    '''Un message par worker ; erreur si un worker s'arrête avant (mémoire insuffisante...)'''
+    values = []
+    while len(values) < len(procs):
+        try:
+            values.append(results.get(timeout=1))
+        except queue.Empty:
+            dead = [proc.exitcode for proc in procs if proc.exitcode not in (None, 0)]
+            if dead:
+                for proc in procs:
+                    proc.terminate()
+                raise RuntimeError(f"worker arrêté (code {dead[0]})")
+    return values
+
+
+def run(n_workers, shared_dir, duration):
+    ctx = multiprocessing.get_context('spawn')
+    ready, results, start, done = ctx.Queue(), ctx.Queue(), ctx.Event(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(shared_dir, ready, start, done, duration, results, i))
+             for i in range(n_workers)]
+    for proc in procs:
+        proc.start()
+    pids = collect(ready, procs)
+    start.set()
+    requests = sum(collect(results, procs))
+    pss, rss = zip(*(memory_mb(pid) for pid in pids))
+    done.set()
+    for proc in procs:
+        proc.join()
+    return {'mode': 'partagé' if shared_dir else 'privé', 'workers': n_workers,
+            'pss_total_mo': sum(pss), 'rss_total_mo': sum(rss),
+            'pss_par_worker_mo': sum(pss) / n_workers, 'requetes_s': requests / duration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--modes', nargs='+', choices=['privé', 'partagé'], default=['privé', 'partagé'])
+    parser.add_argument('--duration', type=float, default=5.0, help="durée de la mesure de débit (s)")
+    parser.add_argument('--shared-dir', default='/dev/shm/credit-scoring-bench')
+    parser.add_argument('--json', help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    if 'partagé' in args.modes:
+        #Publication par un processus chargeur distinct, comme app/serve.py
+        subprocess.run([sys.executable, os.path.join(APP_DIR, 'prepare_data.py'), 'publish',
+                        '--shared-dir', args.shared_dir], check=True)
+
+    results = []
+    print(f"{'mode':>8} {'workers':>8} {'PSS total (Mo)':>15} {'PSS/worker':>11} {'RSS total':>10} {'req/s':>9}")
+    try:
+        for mode in args.modes:
+            for n_workers in args.workers:
+                try:
+                    r = run(n_workers, args.shared_dir if mode == 'partagé' else '', args.duration)
+                except RuntimeError as e:
+                    print(f"{mode:>8} {n_workers:>8} échec : {e}", flush=True)
+                    results.append({'mode': mode, 'workers': n_workers, 'erreur': str(e)})
+                    continue
+                results.append(r)
+                print(f"{r['mode']:>8} {r['workers']:>8} {r['pss_total_mo']:>15.0f} {r['pss_par_worker_mo']:>11.0f} "
+                      f"{r['rss_total_mo']:>10.0f} {r['requetes_s']:>9.0f}", flush=True)
+    finally:
+        shutil.rmtree(args.shared_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpu': os.cpu_count(), 'resultats': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+'''Profil de démarrage à froid du tableau de bord : coût des imports et premier rendu.
+
+L'application est exécutée une fois dans un processus neuf (AppTest, sans
+navigateur) avec ``python -X importtime``. Le rapport donne le temps jusqu'au
+premier rendu complet de la page et le coût d'import cumulé par paquet.
+Avec ``--json``, le rapport est aussi écrit en JSON ; avec ``--max-seconds``,
+le code de sortie est 1 si le premier rendu est plus lent (utilisable en CI).
+
+Usage (depuis la racine du dépôt, données préparées) :
+
+    python benchmarks/profile_startup.py --json startup.json --max-seconds 5
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#Exécuté dans le processus neuf : premier rendu de la page
+FIRST_RENDER = '''
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.run()
+print(json.dumps({"first_render_s": time.perf_counter() - start,
+                  "exceptions": [str(e.value) for e in at.exception]}))
+'''
+
+
+def parse_importtime(stderr):
+    '''Coût d'import cumulé (s) par paquet de premier niveau'''
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        #Imports de premier niveau seulement (sans indentation) : pas de double compte
+        if not name.startswith('  ') and name.strip():
+            packages[name.strip().split('.')[0]] += int(cumulative) / 1e6
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def profile(app_path):
+    env = dict(os.environ)
+    app_dir = os.path.dirname(os.path.abspath(app_path))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [app_dir, env.get('PYTHONPATH')]))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', FIRST_RENDER, app_path],
+                          capture_output=True, text=True, env=env)
+    wall = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    report['process_s'] = wall
+    report['imports_s'] = parse_importtime(proc.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app', 'app.py'))
+    parser.add_argument('--top', type=int, default=15, help="nombre de paquets affichés")
+    parser.add_argument('--json', help="fichier JSON du rapport")
+    parser.add_argument('--max-seconds', type=float, help="échec si le premier rendu dépasse cette durée")
+    args = parser.parse_args()
+
+    report = profile(args.app)
+    report['app'] = args.app
+    print(f"processus complet : {report['process_s']:.2f} s")
+    print(f"premier rendu     : {report['first_render_s']:.2f} s")
+    if report['exceptions']:
+        print(f"exceptions        : {report['exceptions']}")
+    print(f"{'paquet':>20} {'import (s)':>11}")
+    for name, seconds in list(report['imports_s'].items())[:args.top]:
+        print(f"{name:>20} {seconds:>11.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if report['exceptions'] or (args.max_seconds is not None and report['first_render_s'] > args.max_seconds):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
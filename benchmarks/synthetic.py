@@ -0,0 +1,128 @@
+'''Générateur de données synthétiques au format de Home Credit (default_risk, X_sample).
+
+Le dépôt ne contient pas les données : ce générateur produit, à l'échelle
+voulue (de 10k à plusieurs millions de lignes), un répertoire de travail
+complet utilisable par le tableau de bord, l'API et les benchmarks :
+
+    <sortie>/data/default_risk.zip     colonnes lues par la page (SK_ID_CURR,
+                                        CODE_GENDER, DAYS_BIRTH, AMT_INCOME_TOTAL,
+                                        AMT_CREDIT, ..., TARGET en dernier)
+    <sortie>/data/X_sample.zip         SK_ID_CURR, les 149 variables du modèle, TARGET
+    <sortie>/data/features_description.csv, <sortie>/model/LGBMClassifier.pkl (copies)
+
+Les variables de X_sample sont tirées uniformément dans les intervalles vus par
+le modèle à l'entraînement (``feature_infos`` du booster), avec des valeurs
+manquantes : les arbres sont parcourus comme sur des données réelles.
+Les archives sont écrites par morceaux : la mémoire ne dépend pas du volume.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/synthetic.py /tmp/credit-100k --rows 100000
+    cd /tmp/credit-100k && streamlit run /chemin/du/depot/app/app.py
+'''
+import argparse
+import os
+import pickle
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+FIRST_ID = 100002
+#Part de valeurs manquantes dans les variables du modèle
+MISSING_RATE = 0.05
+DEFAULT_RATE = 0.08
+
+
+def feature_ranges(model_path):
+    '''(noms, minimums, maximums) des variables du modèle'''
+    with open(model_path, 'rb') as f:
+        booster = pickle.load(f).booster_
+    infos = booster.dump_model()['feature_infos']
+    names = booster.feature_name()
+    low = np.array([float(infos[name].get('min_value', 0)) for name in names])
+    high = np.array([float(infos[name].get('max_value', 1)) for name in names])
+    return names, low, high
+
+
+def data_chunk(rng, ids, target):
+    n = len(ids)
+    return pd.DataFrame({
+        'SK_ID_CURR': ids,
+        'NAME_CONTRACT_TYPE': rng.choice(['Cash loans', 'Revolving loans'], n, p=[0.9, 0.1]),
+        'CODE_GENDER': rng.choice(['F', 'M'], n, p=[0.66, 0.34]),
+        'CNT_CHILDREN': rng.choice(4, n, p=[0.7, 0.2, 0.08, 0.02]),
+        'AMT_INCOME_TOTAL': rng.lognormal(11.9, 0.5, n).round(1),
+        'AMT_CREDIT': rng.lognormal(13.1, 0.6, n).round(1),
+        'AMT_ANNUITY': rng.lognormal(10.1, 0.5, n).round(1),
+        'AMT_GOODS_PRICE': rng.lognormal(13.0, 0.6, n).round(0),
+        'NAME_FAMILY_STATUS': rng.choice(['Married', 'Single / not married', 'Civil marriage',
+                                          'Separated', 'Widow'], n, p=[0.64, 0.15, 0.1, 0.06, 0.05]),
+        #Âge en jours (positif, comme dans les données préparées du tableau de bord)
+        'DAYS_BIRTH': rng.integers(20 * 365, 69 * 365, n),
+        'TARGET': target,
+    })
+
+
+def sample_chunk(rng, ids, target, names, low, high):
+    X = rng.uniform(low, high, size=(len(ids), len(names)))
+    X[rng.random(X.shape) < MISSING_RATE] = np.nan
+    frame = pd.DataFrame(X, columns=names)
+    frame.insert(0, 'SK_ID_CURR', ids)
+    frame['TARGET'] = target
+    return frame
+
+
+def _write_chunks(path, member, chunks):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        with z.open(member, 'w', force_zip64=True) as f:
+            for i, chunk in enumerate(chunks):
+                f.write(chunk.to_csv(index=False, header=i == 0, float_format='%.6g').encode())
+
+
+def generate(out_dir, rows, sample_rows=None, seed=0, chunk_size=100_000, model_path=None,
+             description_path=None):
+    '''Répertoire de travail synthétique : données, catalogue des colonnes et modèle'''
+    model_path = model_path or os.path.join(ROOT, 'model', 'LGBMClassifier.pkl')
+    description_path = description_path or os.path.join(ROOT, 'data', 'features_description.csv')
+    sample_rows = rows if sample_rows is None else min(sample_rows, rows)
+    names, low, high = feature_ranges(model_path)
+
+    data_dir = os.path.join(out_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'model'), exist_ok=True)
+    shutil.copy(model_path, os.path.join(out_dir, 'model', 'LGBMClassifier.pkl'))
+    shutil.copy(description_path, os.path.join(data_dir, 'features_description.csv'))
+
+    #Mêmes identifiants et même TARGET dans les deux tables (X_sample = premiers clients)
+    def chunks(n_rows, make):
+        target_rng, rng = np.random.default_rng(seed), np.random.default_rng(seed + 1)
+        for start in range(0, n_rows, chunk_size):
+            n = min(chunk_size, n_rows - start)
+            ids = FIRST_ID + 3 * np.arange(start, start + n)
+            target = (target_rng.random(n) < DEFAULT_RATE).astype(np.int8)
+            yield make(rng, ids, target)
+
+    _write_chunks(os.path.join(data_dir, 'default_risk.zip'), 'default_risk.csv',
+                  chunks(rows, data_chunk))
+    _write_chunks(os.path.join(data_dir, 'X_sample.zip'), 'X_sample.csv',
+                  chunks(sample_rows, lambda rng, ids, target: sample_chunk(rng, ids, target, names, low, high)))
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help="répertoire de travail à créer")
+    parser.add_argument('--rows', type=int, default=100_000, help="lignes de default_risk")
+    parser.add_argument('--sample-rows', type=int, default=None, help="lignes de X_sample (défaut : --rows)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.output, args.rows, args.sample_rows, args.seed)
+    print(f"Données synthétiques ({args.rows} lignes) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()